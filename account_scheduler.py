@@ -0,0 +1,154 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import util
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from models import MessageResponse
+from config import settings
+
+Account = Tuple[str, str]
+
+# Set in each worker process by _init_worker
+_worker_processor = None
+
+
+def configured_accounts() -> List[Account]:
+    """Get the (email, password) of every configured account, the primary one first"""
+    accounts: Dict[str, str] = {}
+    if settings.zillow_email and settings.zillow_password:
+        accounts[settings.zillow_email] = settings.zillow_password
+    for account in settings.zillow_accounts:
+        accounts.setdefault(account["email"], account["password"])
+    return list(accounts.items())
+
+
+def _init_worker(browsers: int, slot: int):
+    """Give the worker process its own browser pool and processor"""
+    global _worker_processor
+    from browser_pool import BrowserPool
+    from message_processor import MessageProcessor
+    from metrics import mark_process_dead
+    from selector_registry import selector_registry
+
+    # Worker pools get their own Chrome profiles, two browsers cannot share one
+    pool = BrowserPool(size=browsers, profile_namespace=f"worker{slot}")
+    _worker_processor = MessageProcessor(pool=pool)
+    # Worker processes exit without running atexit hooks, finalizers still run
+    util.Finalize(pool, pool.close, exitpriority=10)
+    util.Finalize(selector_registry, selector_registry.flush, exitpriority=5)
+    util.Finalize(None, mark_process_dead, exitpriority=1)
+
+
+def _process_account(email: str, password: str) -> MessageResponse:
+    """Process one account's unread messages inside a worker process"""
+    from metrics import refresh_gauges
+
+    try:
+        return _worker_processor.process_unread_messages(email, password)
+    finally:
+        # The parent only refreshes its own gauges when /metrics is scraped
+        refresh_gauges()
+
+
+class AccountScheduler:
+    """Processes several accounts in parallel, one worker process per slot
+
+    Each account is pinned to the same worker process on every run so it
+    keeps its warm, logged-in browser. At most max_workers accounts run at
+    once; the rest queue behind them on their slot.
+    """
+
+    def __init__(self, accounts: Optional[List[Account]] = None,
+                 max_workers: Optional[int] = None):
+        self.accounts = accounts if accounts is not None else configured_accounts()
+        workers = max_workers or settings.account_workers or os.cpu_count() or 1
+        self.max_workers = max(1, min(workers, len(self.accounts)))
+        self._slots: List[ProcessPoolExecutor] = []
+        self._lock = threading.Lock()
+
+    def _slot_for(self, index: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if not self._slots:
+                browsers = math.ceil(len(self.accounts) / self.max_workers)
+                # Spawn rather than fork, the parent runs threads and browsers
+                context = multiprocessing.get_context("spawn")
+                self._slots = [
+                    ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                        initializer=_init_worker, initargs=(browsers, slot))
+                    for slot in range(self.max_workers)
+                ]
+            return self._slots[index % self.max_workers]
+
+    def process_all(self, progress_callback: Optional[Callable[[int, int], None]] = None,
+                    cancel_event: Optional[threading.Event] = None) -> MessageResponse:
+        """Process every account and aggregate the results into one response"""
+        total = len(self.accounts)
+        if progress_callback:
+            progress_callback(0, total)
+
+        futures: Dict[Future, str] = {
+            self._slot_for(index).submit(_process_account, email, password): email
+            for index, (email, password) in enumerate(self.accounts)
+        }
+        results: Dict[str, MessageResponse] = {}
+        pending = set(futures)
+        cancelled = False
+        while pending:
+            done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                email = futures[future]
+                if future.cancelled():
+                    continue
+                try:
+                    results[email] = future.result()
+                except Exception as e:
+                    logger.error(f"Processing {email} failed: {e}")
+                    results[email] = MessageResponse(
+                        success=False,
+                        message=f"Error processing messages: {str(e)}",
+                        errors=[str(e)]
+                    )
+            if progress_callback:
+                progress_callback(len(results), total)
+
+            # Accounts that have not started yet can still be skipped
+            if not cancelled and cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                skipped = sum(future.cancel() for future in pending)
+                logger.info(f"Cancelled processing of {skipped} queued accounts")
+
+        return self._aggregate(results, cancelled)
+
+    def _aggregate(self, results: Dict[str, MessageResponse], cancelled: bool) -> MessageResponse:
+        processed_count = sum(result.processed_count for result in results.values())
+        errors = [
+            f"{email}: {error}"
+            for email, result in results.items()
+            for error in (result.errors or ([result.message] if not result.success else []))
+        ]
+        failed = [email for email, result in results.items() if not result.success]
+
+        if cancelled:
+            message = (f"Cancelled after processing {processed_count} messages "
+                       f"across {len(results)} of {len(self.accounts)} accounts")
+        else:
+            message = f"Processed {processed_count} messages across {len(results)} accounts"
+            if failed:
+                message += f", {len(failed)} failed"
+        return MessageResponse(
+            success=not cancelled and not failed,
+            message=message,
+            processed_count=processed_count,
+            replies_sent=sum(result.replies_sent for result in results.values()),
+            errors=errors
+        )
+
+    def shutdown(self):
+        """Stop the worker processes, which close their browsers on exit"""
+        with self._lock:
+            slots, self._slots = self._slots, []
+        for slot in slots:
+            slot.shutdown(wait=True, cancel_futures=True)
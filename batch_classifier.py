@@ -0,0 +1,218 @@
+"""Classify large batches of messages as a stream.
+
+Input is NDJSON or a JSON array of {"message_content", "prospect_name"}
+objects; output is one NDJSON result per input record. Usage:
+
+    python batch_classifier.py inquiries.ndjson > results.ndjson
+    cat inquiries.json | python batch_classifier.py -
+"""
+import argparse
+import codecs
+import json
+import sys
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from message_classifier import MessageClassifier
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+# Longest record buffered while waiting for it to complete, in characters
+MAX_RECORD_CHARS = 1024 * 1024
+
+
+class InvalidRecord:
+    """A malformed NDJSON line; it is reported in the output and parsing carries on"""
+
+    def __init__(self, line: int, error: str):
+        self.line = line
+        self.error = error
+
+
+class RecordParser:
+    """Incrementally parses NDJSON or a JSON array from arbitrary text chunks
+
+    NDJSON holds one record per line, so a malformed or overlong line is
+    returned as an InvalidRecord and skipped. A JSON array cannot be
+    resynchronised after an error, so there a malformed record or one
+    longer than max_record_chars raises ValueError.
+    """
+
+    def __init__(self, max_record_chars: int = MAX_RECORD_CHARS):
+        self.max_record_chars = max_record_chars
+        self._buffer = ""
+        self._is_array: Optional[bool] = None
+        self._finished = False
+        self._line = 0
+        self._discarding = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk of text and return every record completed by it"""
+        self._buffer += chunk
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        """Flush the final record once the input is exhausted"""
+        records = self._drain(final=True)
+        if self._is_array and not self._finished:
+            raise ValueError("Unterminated JSON array")
+        if self._buffer.strip(_WHITESPACE):
+            raise ValueError("Trailing data after last record")
+        return records
+
+    def _drain(self, final: bool) -> List[Any]:
+        if self._is_array is None:
+            position = self._skip(0)
+            if position == len(self._buffer):
+                self._line += self._buffer.count("\n")
+                self._buffer = ""
+                return []
+            self._is_array = self._buffer[position] == "["
+            if self._is_array:
+                position += 1
+            else:
+                # Keep NDJSON line numbers right across leading blank lines
+                position = self._buffer.rfind("\n", 0, position) + 1
+                self._line += self._buffer.count("\n", 0, position)
+            self._buffer = self._buffer[position:]
+
+        if self._is_array:
+            return self._drain_array(final)
+        return self._drain_lines(final)
+
+    def _drain_lines(self, final: bool) -> List[Any]:
+        records = []
+        while True:
+            newline = self._buffer.find("\n")
+            if newline == -1:
+                if len(self._buffer) > self.max_record_chars:
+                    # Drop an overlong line as it arrives instead of buffering all of it
+                    self._buffer = ""
+                    self._discarding = True
+                if not final or not (self._discarding or self._buffer.strip(_WHITESPACE)):
+                    if final:
+                        self._buffer = ""
+                    return records
+                line, self._buffer = self._buffer, ""
+            else:
+                line, self._buffer = self._buffer[:newline], self._buffer[newline + 1:]
+
+            self._line += 1
+            if self._discarding:
+                self._discarding = False
+                records.append(InvalidRecord(self._line, f"Line exceeds {self.max_record_chars} characters"))
+            elif line.strip(_WHITESPACE):
+                try:
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    records.append(InvalidRecord(self._line, str(e)))
+
+    def _drain_array(self, final: bool) -> List[Any]:
+        records = []
+        while True:
+            position = self._skip(0)
+            if position == len(self._buffer):
+                self._buffer = ""
+                return records
+
+            if self._finished:
+                raise ValueError("Trailing data after JSON array")
+
+            if self._buffer[position] in ",]":
+                self._finished = self._buffer[position] == "]"
+                self._buffer = self._buffer[position + 1:]
+                continue
+
+            try:
+                record, end = _decoder.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                # Wait for more input unless nothing more is coming
+                if final:
+                    raise
+                if len(self._buffer) - position > self.max_record_chars:
+                    raise ValueError(f"Record exceeds {self.max_record_chars} characters")
+                self._buffer = self._buffer[position:]
+                return records
+
+            # A number at the very end of a chunk may still be incomplete
+            if end == len(self._buffer) and not final and not isinstance(record, (dict, list)):
+                self._buffer = self._buffer[position:]
+                return records
+
+            records.append(record)
+            self._buffer = self._buffer[end:]
+
+    def _skip(self, position: int) -> int:
+        while position < len(self._buffer) and self._buffer[position] in _WHITESPACE:
+            position += 1
+        return position
+
+
+def classify_record(classifier: MessageClassifier, record: Any) -> Dict[str, Any]:
+    """Classify one input record and render its response template"""
+    if isinstance(record, InvalidRecord):
+        return {"error": f"Invalid JSON on line {record.line}: {record.error}", "line": record.line}
+    if not isinstance(record, dict) or not isinstance(record.get("message_content"), str):
+        return {"error": "Record must be an object with a message_content string"}
+
+    message_content = record["message_content"]
+    prospect_name = record.get("prospect_name") or ""
+    message_type = classifier.classify_message(message_content, prospect_name)
+    return {
+        "message_content": message_content,
+        "prospect_name": prospect_name,
+        "classified_type": message_type.value,
+        "response_template": classifier.get_response_template(message_type, prospect_name),
+    }
+
+
+def classify_stream(chunks: Iterable[str],
+                    classifier: Optional[MessageClassifier] = None) -> Iterator[str]:
+    """Classify records from text chunks, yielding one NDJSON line per record"""
+    classifier = classifier or MessageClassifier()
+    parser = RecordParser()
+    try:
+        for chunk in chunks:
+            for record in parser.feed(chunk):
+                yield json.dumps(classify_record(classifier, record)) + "\n"
+        for record in parser.close():
+            yield json.dumps(classify_record(classifier, record)) + "\n"
+    except ValueError as e:
+        # Malformed JSON array input, report it like the HTTP endpoint does
+        yield json.dumps({"error": f"Invalid input: {e}"}) + "\n"
+
+
+async def classify_byte_stream(chunks: AsyncIterable[bytes],
+                               classifier: MessageClassifier) -> AsyncIterator[str]:
+    """Classify records from a UTF-8 byte stream such as a request body"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parser = RecordParser()
+    try:
+        async for chunk in chunks:
+            for record in parser.feed(decoder.decode(chunk)):
+                yield json.dumps(classify_record(classifier, record)) + "\n"
+        for record in parser.feed(decoder.decode(b"", final=True)) + parser.close():
+            yield json.dumps(classify_record(classifier, record)) + "\n"
+    except ValueError as e:
+        # Headers are already sent, so report malformed input in-band
+        yield json.dumps({"error": f"Invalid input: {e}"}) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify NDJSON or JSON array input as NDJSON")
+    parser.add_argument("input", nargs="?", default="-", help="input file, or - for stdin")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        chunks = iter(lambda: source.read(args.chunk_size), "")
+        for line in classify_stream(chunks):
+            sys.stdout.write(line)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure MessageClassifier throughput on a synthetic inquiry corpus.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_classifier --messages 200000
+"""
+import argparse
+import json
+import time
+from typing import Callable, List, Tuple
+
+from benchmarks.corpus import synthetic_messages
+from message_classifier import CATEGORY_PRIORITY, MessageClassifier
+from models import MessageType
+from config import settings
+
+
+def substring_classify(message_content: str) -> MessageType:
+    """The previous per-category substring scan, kept as a baseline"""
+    content_lower = message_content.lower()
+    for category, message_type in CATEGORY_PRIORITY:
+        if any(keyword in content_lower for keyword in settings.message_keywords[category]):
+            return message_type
+    return MessageType.GENERAL_INQUIRY
+
+
+def substring_categories(message_content: str) -> set:
+    """Every category hit using the previous substring scan"""
+    content_lower = message_content.lower()
+    return {
+        category for category, keywords in settings.message_keywords.items()
+        if any(keyword in content_lower for keyword in keywords)
+    }
+
+
+def throughput(classify: Callable[[str], object],
+               corpus: List[Tuple[str, str]]) -> float:
+    """Messages classified per second"""
+    start = time.perf_counter()
+    for message_content, _ in corpus:
+        classify(message_content)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    corpus = synthetic_messages(args.messages, args.seed)
+    classifier = MessageClassifier()
+
+    disagreements = sum(
+        substring_classify(content) != classifier.classify_message(content)
+        for content, _ in corpus
+    )
+    results = {
+        "messages": len(corpus),
+        "compiled_msgs_per_second": throughput(classifier.classify_message, corpus),
+        "substring_msgs_per_second": throughput(substring_classify, corpus),
+        "compiled_all_categories_msgs_per_second": throughput(classifier.matched_categories, corpus),
+        "substring_all_categories_msgs_per_second": throughput(substring_categories, corpus),
+        "word_boundary_disagreements": disagreements,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
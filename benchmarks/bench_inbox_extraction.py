@@ -0,0 +1,74 @@
+"""Compare batched and per-element inbox extraction against a logged-in inbox.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_inbox_extraction --rounds 5
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from zillow_selenium_scraper import ZillowSeleniumScraper
+from config import settings
+
+
+class CommandCounter:
+    """Counts WebDriver commands sent by a driver"""
+
+    def __init__(self, driver):
+        self.count = 0
+        self._execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            self.count += 1
+            return self._execute(driver_command, params)
+
+        driver.execute = counted_execute
+
+
+def measure(extract: Callable[[], List], counter: CommandCounter,
+            rounds: int) -> Dict[str, float]:
+    """Time an extraction function and count its WebDriver round trips"""
+    durations = []
+    commands = []
+    found = 0
+    for _ in range(rounds):
+        counter.count = 0
+        start = time.perf_counter()
+        found = len(extract())
+        durations.append(time.perf_counter() - start)
+        commands.append(counter.count)
+
+    return {
+        "messages": found,
+        "median_seconds": statistics.median(durations),
+        "min_seconds": min(durations),
+        "webdriver_commands": statistics.median(commands),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    scraper = ZillowSeleniumScraper()
+    try:
+        if not scraper.login(settings.zillow_email, settings.zillow_password):
+            raise SystemExit("Login failed, cannot benchmark the inbox")
+        scraper.navigate_to_messages()
+
+        counter = CommandCounter(scraper.driver)
+        results = {
+            "batched": measure(scraper._get_unread_messages_batched, counter, args.rounds),
+            "per_element": measure(scraper._get_unread_messages_per_element, counter, args.rounds),
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        scraper.close()
+
+
+if __name__ == "__main__":
+    main()
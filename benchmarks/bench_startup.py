@@ -0,0 +1,80 @@
+"""Compare browser startup with and without the driver cache and a warm profile.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --rounds 3
+    python -m benchmarks.bench_startup --url https://www.zillow.com/rental-manager/inbox/
+
+Each mode launches Chrome rounds times and times initialize() and the first
+page load. The cached modes are primed with one untimed launch. Without
+--url the first page is the replay server's inbox.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, Optional
+
+from config import settings
+from replay_server import ReplayServer, build_corpus
+from zillow_selenium_scraper import ZillowSeleniumScraper
+
+
+def launch(url: str, profile_dir: Optional[str]) -> Dict[str, float]:
+    """Start one browser, load url and close it again"""
+    scraper = ZillowSeleniumScraper()
+    scraper.profile_dir = profile_dir
+    try:
+        start = time.perf_counter()
+        scraper.initialize()
+        started = time.perf_counter()
+        scraper.driver.get(url)
+        loaded = time.perf_counter()
+    finally:
+        scraper.close()
+    return {"initialize": started - start, "first_page": loaded - started}
+
+
+def measure(url: str, rounds: int, cache_path: str, profile_dir: Optional[str],
+            prime: bool) -> Dict[str, float]:
+    """Median startup and first page load over rounds launches"""
+    settings.chromedriver_cache_path = cache_path
+    if prime:
+        launch(url, profile_dir)
+
+    timings = [launch(url, profile_dir) for _ in range(rounds)]
+    return {
+        "median_initialize_seconds": statistics.median(t["initialize"] for t in timings),
+        "median_first_page_seconds": statistics.median(t["first_page"] for t in timings),
+        "min_initialize_seconds": min(t["initialize"] for t in timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--url", help="first page to load, defaults to the replay server's inbox")
+    args = parser.parse_args()
+
+    original_cache_path, original_human_delays = settings.chromedriver_cache_path, settings.human_delays
+    settings.human_delays = False
+    try:
+        with ReplayServer(build_corpus(200)) as server, tempfile.TemporaryDirectory() as workdir:
+            url = args.url or f"{server.url}/rental-manager/inbox/"
+            cache_path = os.path.join(workdir, "chromedriver")
+            profile_dir = os.path.join(workdir, "profile")
+            results = {
+                # Patch a fresh driver into a throwaway profile on every launch
+                "uncached": measure(url, args.rounds, "", None, prime=False),
+                "cached_driver": measure(url, args.rounds, cache_path, None, prime=True),
+                "cached_driver_warm_profile": measure(url, args.rounds, cache_path, profile_dir, prime=True),
+            }
+        print(json.dumps(results, indent=2))
+    finally:
+        settings.chromedriver_cache_path, settings.human_delays = original_cache_path, original_human_delays
+
+
+if __name__ == "__main__":
+    main()
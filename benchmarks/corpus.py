@@ -0,0 +1,46 @@
+"""Reproducible synthetic Zillow inquiries for benchmarks."""
+import random
+from typing import List, Tuple
+
+FIRST_NAMES = [
+    "John", "Maria", "Aisha", "Wei", "Carlos", "Fatima", "Liam", "Priya",
+    "Noah", "Sofia", "Kwame", "Elena", "",
+]
+
+OPENERS = [
+    "Hi,", "Hello!", "Good morning,", "Hey there.", "Hi there,", "",
+]
+
+BODIES = [
+    "I'd like to schedule a tour of the apartment this weekend.",
+    "Is it possible to visit the unit before applying?",
+    "How do I apply for this apartment?",
+    "I'm interested in the 2 bedroom, where is the application?",
+    "Do you accept Section 8 vouchers?",
+    "I have a Homebase voucher and RAFT assistance, is that ok?",
+    "We have MRVP through the housing authority.",
+    "I have a small dog, are pets allowed?",
+    "My cat is a registered service animal.",
+    "Is this apartment still available?",
+    "How much is the rent and when is it available?",
+    "Great location! What is the price including utilities?",
+    "Is the building close to public transportation?",
+    "Can you tell me more about the neighborhood and parking?",
+]
+
+CLOSERS = [
+    "Thanks!", "Thank you.", "Looking forward to hearing from you.",
+    "Please call me back.", "",
+]
+
+
+def synthetic_messages(count: int, seed: int = 1234) -> List[Tuple[str, str]]:
+    """Build (message_content, prospect_name) pairs deterministically"""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        parts = [rng.choice(OPENERS)]
+        parts.extend(rng.sample(BODIES, rng.randint(1, 3)))
+        parts.append(rng.choice(CLOSERS))
+        messages.append((" ".join(p for p in parts if p), rng.choice(FIRST_NAMES)))
+    return messages
@@ -0,0 +1,123 @@
+"""In-memory stand-ins for the browser layer used by benchmarks and tests."""
+import itertools
+from typing import Any, Dict, Iterator, List, Optional
+
+from selenium.common.exceptions import NoSuchWindowException
+
+from benchmarks.corpus import synthetic_messages
+from selector_registry import FIRST_MATCH_SCRIPT
+from zillow_selenium_scraper import ZillowSeleniumScraper
+from models import ZillowMessage
+
+
+class FakeSwitchTo:
+    def __init__(self, driver: "FakeDriver"):
+        self._driver = driver
+
+    def window(self, handle: str):
+        if handle not in self._driver.tabs:
+            raise NoSuchWindowException(f"No window {handle}")
+        self._driver.current_window_handle = handle
+
+
+class FakeDriver:
+    """The tab handling of a WebDriver: opening, switching to and closing windows
+
+    Every page counts as rendered, so readiness waits return at once.
+    """
+
+    def __init__(self):
+        self._handles = (f"tab-{number}" for number in itertools.count())
+        self.current_window_handle = next(self._handles)
+        self.tabs: Dict[str, str] = {self.current_window_handle: "about:blank"}
+        self.switch_to = FakeSwitchTo(self)
+
+    @property
+    def window_handles(self) -> List[str]:
+        return list(self.tabs)
+
+    @property
+    def current_url(self) -> str:
+        if self.current_window_handle not in self.tabs:
+            raise NoSuchWindowException("The current window was closed")
+        return self.tabs[self.current_window_handle]
+
+    def get(self, url: str):
+        self.tabs[self.current_window_handle] = url
+
+    def execute_script(self, script: str, *args) -> Any:
+        if script.startswith("window.open("):
+            self.tabs[next(self._handles)] = args[0]
+        elif script.startswith("window.location.href"):
+            self.get(args[0])
+        elif script == FIRST_MATCH_SCRIPT:
+            return 0
+        return None
+
+    def execute_cdp_cmd(self, cmd: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        del self.tabs[self.current_window_handle]
+
+    def quit(self):
+        self.tabs.clear()
+
+
+class FakeScraper(ZillowSeleniumScraper):
+    """Scraper that serves a synthetic inbox without starting a browser"""
+
+    def __init__(self, message_count: int = 100, seed: int = 1234):
+        super().__init__()
+        self.message_count = message_count
+        self.seed = seed
+        self.sent_replies: List[str] = []
+        # Page each reply was sent on
+        self.sent_urls: List[str] = []
+
+    def initialize(self, email: Optional[str] = None):
+        self.driver = FakeDriver()
+
+    def is_alive(self) -> bool:
+        return self.driver is not None
+
+    def login(self, email: str, password: str) -> bool:
+        if not self.driver:
+            self.initialize(email)
+        self.is_logged_in = True
+        self.logged_in_email = email
+        return True
+
+    def verify_session(self) -> bool:
+        return self.is_logged_in
+
+    def navigate_to_messages(self) -> bool:
+        return True
+
+    def iter_unread_messages(self, known_keys: Optional[List[str]] = None) -> Iterator[ZillowMessage]:
+        for index, (message_content, prospect_name) in enumerate(
+            synthetic_messages(self.message_count, self.seed)
+        ):
+            yield self._build_message(
+                conversation_id=str(10_000_000 + index),
+                prospect_name=prospect_name or "Unknown",
+                message_content=message_content,
+                property_address="1 Example St #1"
+            )
+
+    def open_conversation(self, conversation_url: str) -> bool:
+        self.driver.get(conversation_url)
+        return True
+
+    def already_replied(self) -> bool:
+        return False
+
+    def send_reply(self, message: str) -> bool:
+        self.sent_replies.append(message)
+        self.sent_urls.append(self.driver.current_url)
+        return True
+
+    def close(self):
+        self.driver = None
+        self.is_logged_in = False
+        self.logged_in_email = None
@@ -0,0 +1,235 @@
+"""Reproducible performance benchmarks with JSON results.
+
+Run from the repository root:
+
+    python -m benchmarks.run                        # every benchmark
+    python -m benchmarks.run classifier processor   # a subset
+    python -m benchmarks.run --compare benchmarks/results/<older>.json
+
+Each run writes benchmarks/results/<timestamp>-<commit>.json. Benchmarks
+that need Chrome (extract_message_data) run against the local replay
+server and are recorded as skipped when no browser can be started.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from loguru import logger
+
+from benchmarks.corpus import synthetic_messages
+from benchmarks.fakes import FakeScraper
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def timed(func: Callable[[], Any], repeat: int, operations: int = 1) -> Dict[str, float]:
+    """Run func repeat times and summarise wall time per run and per operation"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    median = statistics.median(durations)
+    return {
+        "repeat": repeat,
+        "operations": operations,
+        "min_seconds": min(durations),
+        "median_seconds": median,
+        "ops_per_second": operations / median if median else None,
+    }
+
+
+def bench_classifier(args) -> Dict[str, Any]:
+    """MessageClassifier.classify_message and get_response_template"""
+    from message_classifier import MessageClassifier
+
+    corpus = synthetic_messages(args.messages, args.seed)
+    classifier = MessageClassifier()
+    types = [classifier.classify_message(content, name) for content, name in corpus]
+
+    return {
+        "classify_message": timed(
+            lambda: [classifier.classify_message(content, name) for content, name in corpus],
+            args.repeat, len(corpus)
+        ),
+        "get_response_template": timed(
+            lambda: [classifier.get_response_template(t, name) for t, (_, name) in zip(types, corpus)],
+            args.repeat, len(corpus)
+        ),
+    }
+
+
+def _processor(workdir: str, message_count: int, seed: int):
+    from browser_pool import BrowserPool
+    from message_processor import MessageProcessor
+    from message_store import HandledConversationIndex, InboxWatermarkIndex, ProcessedMessageStore, RunCheckpoint
+
+    db_path = os.path.join(workdir, f"bench-{time.monotonic_ns()}.db")
+    return MessageProcessor(
+        pool=BrowserPool(size=1, scraper_factory=lambda: FakeScraper(message_count, seed)),
+        store=ProcessedMessageStore(db_path),
+        handled_index=HandledConversationIndex(db_path),
+        watermarks=InboxWatermarkIndex(db_path),
+        checkpoint=RunCheckpoint(db_path)
+    )
+
+
+def bench_build_response(args) -> Dict[str, Any]:
+    """MessageProcessor._build_complete_response"""
+    with tempfile.TemporaryDirectory() as workdir:
+        processor = _processor(workdir, 0, args.seed)
+        classifier = processor.classifier
+        prepared = []
+        for content, name in synthetic_messages(args.messages, args.seed):
+            message_type = classifier.classify_message(content, name)
+            prepared.append((classifier.get_response_template(message_type, name),
+                             message_type, content, name))
+
+        return {
+            "build_complete_response": timed(
+                lambda: [processor._build_complete_response(*p) for p in prepared],
+                args.repeat, len(prepared)
+            ),
+        }
+
+
+def bench_processor(args) -> Dict[str, Any]:
+    """A full process_unread_messages run against a fake scraper"""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        def run():
+            # Fresh stores every time so the dedupe index does not skip everything
+            processor = _processor(workdir, args.inbox_size, args.seed)
+            response = processor.process_unread_messages("bench@example.com", "bench")
+            results["processed_count"] = response.processed_count
+
+        results["process_unread_messages"] = timed(run, args.repeat, args.inbox_size)
+    return results
+
+
+def bench_extraction(args) -> Dict[str, Any]:
+    """ZillowSeleniumScraper._extract_message_data against replay server pages"""
+    from selenium.webdriver.common.by import By
+    from config import settings
+    from replay_server import ReplayServer, build_corpus
+    from zillow_selenium_scraper import ZillowSeleniumScraper
+
+    with ReplayServer(build_corpus(args.inbox_size, unread_ratio=1.0, seed=args.seed)) as server:
+        original_base_url, original_human_delays = settings.zillow_base_url, settings.human_delays
+        settings.zillow_base_url, settings.human_delays = server.url, False
+        scraper = ZillowSeleniumScraper()
+        try:
+            try:
+                scraper.initialize()
+            except Exception as e:
+                return {"skipped": f"Chrome unavailable: {e}"}
+
+            scraper.login("bench@example.com", "bench")
+            scraper.navigate_to_messages()
+            return {
+                "extract_message_data": timed(
+                    lambda: [scraper._extract_message_data(element) for element in
+                             scraper.driver.find_elements(By.CSS_SELECTOR, '[data-testid="conversation-item"]')],
+                    args.repeat, args.inbox_size
+                ),
+                "batched_extraction": timed(
+                    scraper._get_unread_messages_batched, args.repeat, args.inbox_size
+                ),
+            }
+        finally:
+            scraper.close()
+            settings.zillow_base_url, settings.human_delays = original_base_url, original_human_delays
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Dict[str, Any]]] = {
+    "classifier": bench_classifier,
+    "build_response": bench_build_response,
+    "processor": bench_processor,
+    "extraction": bench_extraction,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """Print the median time change of each measurement against an earlier run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline['commit']} ({baseline['started_at']}):")
+    for bench, measurements in current["results"].items():
+        for name, stats in measurements.items():
+            before = baseline["results"].get(bench, {}).get(name)
+            if not isinstance(stats, dict) or not isinstance(before, dict):
+                continue
+            change = (stats["median_seconds"] / before["median_seconds"] - 1) * 100
+            print(f"  {bench}.{name}: {before['median_seconds']:.4f}s -> "
+                  f"{stats['median_seconds']:.4f}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--messages", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--inbox-size", type=int, default=200, help="conversations per inbox run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/...)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    # Log lines would dominate the measurements
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    started_at = datetime.now()
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "started_at": started_at.isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "messages": args.messages,
+            "inbox_size": args.inbox_size,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    selected: List[str] = args.benchmarks or list(BENCHMARKS)
+    for name in selected:
+        print(f"Running {name}...", file=sys.stderr)
+        report["results"][name] = BENCHMARKS[name](args)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{started_at:%Y%m%d-%H%M%S}-{report['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
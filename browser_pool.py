@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+from loguru import logger
+from zillow_selenium_scraper import ZillowSeleniumScraper
+from metrics import LOGIN_FAILURES
+from tracing import span
+from driver_lifecycle import driver_lifecycle
+from config import settings
+
+
+class BrowserPool:
+    """Keeps a bounded set of logged-in scrapers warm between processing runs"""
+
+    def __init__(self, size: Optional[int] = None,
+                 scraper_factory: Callable[[], ZillowSeleniumScraper] = ZillowSeleniumScraper,
+                 profile_namespace: str = "pool"):
+        self.size = size or settings.browser_pool_size
+        self.scraper_factory = scraper_factory
+        self.profile_namespace = profile_namespace
+        self._free_slots = set(range(self.size))
+        self._slots: Dict[int, int] = {}
+        self._idle: List[ZillowSeleniumScraper] = []
+        self._last_used: Dict[int, float] = {}
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {
+            "leases": 0,
+            "cold_starts": 0,
+            "logins": 0,
+            "session_restores": 0,
+            "session_checks": 0,
+            "reauthentications": 0,
+            "health_check_failures": 0,
+            "restarts": 0,
+            "lease_timeouts": 0,
+        }
+
+    @contextmanager
+    def lease(self, email: str, password: str) -> Iterator[ZillowSeleniumScraper]:
+        """Lease a scraper authenticated as the given account, returning it afterwards"""
+        with span("lease", "pool"):
+            scraper = self._acquire(email)
+        try:
+            with span("prepare_browser", "pool"):
+                self._prepare(scraper, email, password)
+            yield scraper
+        finally:
+            self._release(scraper)
+
+    def _acquire(self, email: str) -> ZillowSeleniumScraper:
+        """Take an idle scraper, preferring one already logged in as this account"""
+        deadline = time.monotonic() + settings.browser_pool_lease_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+
+                for index, scraper in enumerate(self._idle):
+                    if scraper.logged_in_email == email:
+                        self._stats["leases"] += 1
+                        return self._idle.pop(index)
+
+                # Another account's browser would have to log out first, start a new one while there is room
+                if self._created < self.size:
+                    self._created += 1
+                    self._stats["leases"] += 1
+                    return self._create()
+
+                if self._idle:
+                    self._stats["leases"] += 1
+                    return self._idle.pop()
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["lease_timeouts"] += 1
+                    raise TimeoutError("Timed out waiting for a free browser")
+                self._condition.wait(remaining)
+
+    def _create(self) -> ZillowSeleniumScraper:
+        """Create a scraper on the lowest free slot, which owns a persistent Chrome profile"""
+        slot = min(self._free_slots)
+        self._free_slots.discard(slot)
+        scraper = self.scraper_factory()
+        self._slots[id(scraper)] = slot
+        if settings.chrome_profile_dir:
+            scraper.profile_dir = os.path.join(settings.chrome_profile_dir,
+                                               f"{self.profile_namespace}-{slot}")
+        return scraper
+
+    def _discard(self, scraper: ZillowSeleniumScraper):
+        """Forget a closed scraper and free its slot, called with the lock held"""
+        self._created -= 1
+        self._last_used.pop(id(scraper), None)
+        self._free_slots.add(self._slots.pop(id(scraper)))
+
+    def _prepare(self, scraper: ZillowSeleniumScraper, email: str, password: str):
+        """Make sure the leased scraper has a live driver and an authenticated session"""
+        if scraper.driver and not scraper.is_alive():
+            logger.warning("Pooled browser failed health check, restarting it")
+            self._count("health_check_failures")
+            scraper.close()
+
+        if not scraper.driver:
+            self._count("cold_starts")
+            scraper.initialize(email)
+            if scraper.is_logged_in and scraper.logged_in_email == email:
+                self._count("session_restores")
+                return
+
+        if scraper.is_logged_in and scraper.logged_in_email == email:
+            idle_for = time.time() - self._last_used.get(id(scraper), 0)
+            if idle_for < settings.browser_pool_session_check_after:
+                return
+            self._count("session_checks")
+            if scraper.verify_session():
+                return
+            logger.info(f"Pooled session for {email} expired, re-authenticating")
+            self._count("reauthentications")
+
+        self._count("logins")
+        if not scraper.login(email, password):
+            LOGIN_FAILURES.inc()
+
+    def restart(self, scraper: ZillowSeleniumScraper, email: str, password: str):
+        """Replace a leased scraper's browser mid-run, authenticated as the same account"""
+        logger.warning(f"Restarting the browser leased for {email}")
+        self._count("restarts")
+        scraper.close()
+        self._prepare(scraper, email, password)
+
+    def _release(self, scraper: ZillowSeleniumScraper):
+        """Return a scraper to the pool, discarding it if the browser died"""
+        # A recycled scraper keeps its slot and relaunches on the next lease
+        recycled = driver_lifecycle.recycle_if_needed(scraper)
+        alive = recycled or scraper.is_alive()
+        if not alive:
+            scraper.close()
+
+        with self._condition:
+            if self._closed or not alive:
+                self._discard(scraper)
+            else:
+                self._last_used[id(scraper)] = time.time()
+                self._idle.append(scraper)
+            self._condition.notify()
+
+        if self._closed and alive:
+            scraper.close()
+
+    def _count(self, stat: str):
+        with self._condition:
+            self._stats[stat] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Get pool occupancy and lifetime counters"""
+        with self._condition:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle),
+                **self._stats,
+            }
+
+    def close(self):
+        """Close every idle browser and stop handing out new leases"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for scraper in idle:
+                self._discard(scraper)
+            self._condition.notify_all()
+
+        for scraper in idle:
+            scraper.close()
+        logger.info(f"Browser pool closed ({len(idle)} browsers shut down)")
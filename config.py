@@ -6,16 +6,110 @@ class Settings(BaseSettings):
     # Zillow credentials
     zillow_email: str = "YbTenants@gmail.com"
     zillow_password: str = "YbPassw0rd"
+    zillow_base_url: str = "https://www.zillow.com"  # point at replay_server.py for offline runs
+    
+    # Additional landlord accounts, [{"email": ..., "password": ...}, ...].
+    # When set, every run processes all of them in parallel worker processes
+    zillow_accounts: List[Dict[str, str]] = []
+    account_workers: int = 0  # parallel accounts, 0 means one per CPU core
     
     # Browser settings
     headless: bool = False
     browser_timeout: int = 30000
     stealth_mode: bool = True
     human_delays: bool = True
+    batched_inbox_extraction: bool = True  # read the inbox in one script call
+    incremental_inbox_scan: bool = True  # stop the inbox walk at the last scan's items
+    inbox_watermark_size: int = 50  # newest inbox item keys remembered per account
+    inbox_scan_batch_size: int = 25  # conversations walked per script call
+    inbox_scroll_timeout: float = 2  # seconds to wait for a scrolled list to render
+    
+    # Browser startup
+    chrome_profile_dir: str = "chrome_profiles"  # persistent profile per pool slot, "" for throwaway profiles
+    chromedriver_cache_path: str = "drivers/chromedriver"  # patched driver reused across launches, "" to patch every launch
+    
+    # Text entry: "human" types key by key, "bulk" sends the whole string in
+    # one send_keys call, "native" sets the value with one script call
+    login_entry_strategy: str = "human"
+    reply_entry_strategy: str = "native"
+    
+    # Lean page loads: eager page-load strategy and CDP-blocked heavy resources
+    lean_page_load: bool = False
+    lean_blocked_url_patterns: List[str] = [
+        # Images and media
+        "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+        "*.mp4", "*.webm", "*.mp3",
+        # Fonts
+        "*.woff", "*.woff2", "*.ttf", "*.otf",
+        # Map tiles
+        "*maps.googleapis.com*", "*maps.gstatic.com*", "*tiles.mapbox.com*",
+        # Analytics and ads
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*googlesyndication.com*", "*facebook.net*", "*hotjar.com*", "*nr-data.net*",
+        "*newrelic.com*", "*segment.io*", "*quantserve.com*", "*scorecardresearch.com*",
+    ]
+    lean_allowed_url_patterns: List[str] = []  # exempt from the block list above
+    
+    # Readiness waits, each step returns as soon as its condition holds
+    page_ready_timeout: float = 10  # seconds
+    login_timeout: float = 30  # seconds to wait for the post-login redirect
+    reply_confirm_timeout: float = 15  # seconds to wait for the sent bubble
+    wait_poll_interval: float = 0.1  # seconds between condition checks
+    
+    # Selector registry, remembers which candidate selector matches each page
+    selector_registry_path: str = "selector_stats.json"
+    selector_fail_fast_window: float = 600  # seconds a miss keeps the short timeout
+    selector_fail_fast_timeout: float = 2  # seconds to wait after recent misses
+    selector_demote_after: int = 3  # consecutive misses before waits fail fast or the winner is replaced
+    selector_save_interval: float = 30  # seconds between writes of routine hit counters
+    
+    # Inbox backend: "selenium" reads the rendered inbox, "http" lists it
+    # through the inbox JSON API with the browser's session cookies
+    inbox_backend: str = "selenium"
+    inbox_api_path: str = "/rental-manager/api/inbox/conversations"
+    inbox_api_timeout: float = 10.0
+    
+    # Browser pool settings
+    browser_pool_size: int = 1
+    browser_pool_lease_timeout: float = 600  # seconds to wait for a free browser
+    browser_pool_session_check_after: int = 900  # idle seconds before re-probing login
+    
+    # Browser lifecycle, a browser is replaced after either limit, 0 disables it
+    driver_recycle_conversations: int = 200  # conversations opened by one browser
+    driver_recycle_rss_mb: int = 1500  # memory of the browser's whole process tree
+    driver_reap_interval: int = 300  # seconds between orphaned browser sweeps, 0 only at startup
+    driver_orphan_min_age: int = 120  # seconds before an untracked launched browser counts as orphaned
+    
+    # Run timelines in Chrome trace-event format
+    tracing_enabled: bool = True
+    trace_dir: str = "traces"
+    trace_history: int = 20  # recent traces kept in memory and on disk
+    trace_max_events: int = 200000  # spans recorded per run before dropping
+    
+    # Prometheus samples of account worker processes, shared through files here
+    metrics_multiprocess_dir: str = "metrics_multiproc"  # emptied at startup, "" leaves worker metrics out
+    
+    # Session store settings
+    session_store_dir: str = ".sessions"
     
     # Message processing settings
     check_interval: int = 300  # seconds
-    max_retries: int = 3
+    scheduler_enabled: bool = False  # start polling when the server starts
+    scheduler_min_interval: int = 60  # seconds between runs while replies are being sent
+    scheduler_max_interval: int = 1800  # seconds between runs once the inbox has gone quiet
+    scheduler_backoff: float = 1.5  # interval growth after each idle or failed run
+    max_retries: int = 3  # extra attempts per failed message, and browser replacements per run
+    retry_backoff: float = 2  # seconds before the first retry, doubled for each further one
+    retry_backoff_max: float = 30  # seconds
+    run_checkpoint_max_age: int = 86400  # seconds an interrupted run's conversations are resumed for
+    pipelined_processing: bool = False  # load the next conversation in a second tab meanwhile
+    job_workers: int = 1  # concurrent processing runs
+    job_history_size: int = 100  # finished jobs kept for status polling
+    job_event_history: int = 500  # progress events kept per job for /jobs/{id}/events
+    
+    # Processed message history
+    message_store_path: str = "processed_messages.db"
+    message_store_batch_size: int = 50  # processed messages buffered per insert
     
     # Response templates
     response_templates: Dict[str, str] = {
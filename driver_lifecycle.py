@@ -0,0 +1,272 @@
+"""Memory tracking, recycling and orphan reaping for Chrome drivers.
+
+Every live driver is registered with the process ids of its chromedriver
+and its browser; their process trees are measured with psutil. Drivers are
+recycled once they have opened driver_recycle_conversations conversations
+or their tree grows past driver_recycle_rss_mb. Every launch is also
+recorded in the message store, so Chrome and chromedriver processes left
+behind by drivers that were never quit, in this process or in one that
+has died, are reaped at startup and every driver_reap_interval seconds.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import psutil
+from loguru import logger
+from message_store import LaunchedDriverIndex
+from metrics import BROWSER_RSS, DRIVERS_RECYCLED, ORPHANS_REAPED, gauge_function
+from config import settings
+
+MB = 1024 * 1024
+
+
+def _identity(pid: int) -> Optional[Tuple[int, float]]:
+    """A process's pid and start time, which together never refer to another process"""
+    try:
+        return pid, psutil.Process(pid).create_time()
+    except psutil.Error:
+        return None
+
+
+def _running(pid: int, create_time: float) -> Optional[psutil.Process]:
+    """The recorded process if it is still running, None once its pid is gone or reused"""
+    try:
+        process = psutil.Process(pid)
+        if abs(process.create_time() - create_time) < 0.01:
+            return process
+    except psutil.Error:
+        pass
+    return None
+
+
+def _tree(pids: List[int]) -> List[psutil.Process]:
+    """The given processes and all their descendants that are still running"""
+    processes: Dict[int, psutil.Process] = {}
+    for pid in pids:
+        try:
+            root = psutil.Process(pid)
+            processes[root.pid] = root
+            for child in root.children(recursive=True):
+                processes[child.pid] = child
+        except psutil.Error:
+            continue
+    return list(processes.values())
+
+
+def _rss(processes: List[psutil.Process]) -> int:
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+class DriverLifecycle:
+    """Tracks live drivers, decides when to recycle them and reaps orphans"""
+
+    def __init__(self, launches: Optional[LaunchedDriverIndex] = None):
+        self._launches = launches
+        self._drivers: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {"recycled": 0, "orphans_reaped": 0}
+
+    def register(self, scraper):
+        """Start tracking a scraper's freshly launched driver"""
+        driver = scraper.driver
+        pids = [pid for pid in (getattr(driver, "browser_pid", None),
+                                getattr(getattr(getattr(driver, "service", None), "process", None), "pid", None))
+                if pid]
+        with self._lock:
+            self._drivers[id(scraper)] = {
+                "scraper": scraper,
+                "pids": pids,
+                "started_at": time.time(),
+                "conversations": 0,
+                "peak_rss": 0,
+            }
+        launched = [identity for identity in map(_identity, pids) if identity]
+        owner = _identity(os.getpid())
+        try:
+            self.launches.add(launched, owner)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record launched browser processes {pids}: {e}")
+
+    @property
+    def launches(self) -> LaunchedDriverIndex:
+        """The shared record of launched processes, opened on first use"""
+        if self._launches is None:
+            self._launches = LaunchedDriverIndex()
+        return self._launches
+
+    def unregister(self, scraper):
+        with self._lock:
+            self._drivers.pop(id(scraper), None)
+
+    def record_conversation(self, scraper):
+        """Count a conversation opened by the scraper's driver"""
+        with self._lock:
+            record = self._drivers.get(id(scraper))
+            if record:
+                record["conversations"] += 1
+
+    def _measure(self, record: Dict[str, Any]) -> int:
+        rss = _rss(_tree(record["pids"]))
+        record["peak_rss"] = max(record["peak_rss"], rss)
+        return rss
+
+    def recycle_reason(self, scraper) -> Optional[str]:
+        """Why the scraper's driver should be replaced, or None while it is within limits"""
+        with self._lock:
+            record = self._drivers.get(id(scraper))
+        if record is None:
+            return None
+        if settings.driver_recycle_conversations and record["conversations"] >= settings.driver_recycle_conversations:
+            return "conversations"
+        if settings.driver_recycle_rss_mb and self._measure(record) >= settings.driver_recycle_rss_mb * MB:
+            return "memory"
+        return None
+
+    def recycle_if_needed(self, scraper, replace: Optional[Callable[[], None]] = None) -> bool:
+        """Recycle the scraper's driver if it reached a limit
+
+        By default the driver is closed and the next initialize starts
+        fresh; mid-run callers pass replace to swap in a new browser at once.
+        """
+        reason = self.recycle_reason(scraper)
+        if reason is None:
+            return False
+        logger.info(f"Recycling browser for {scraper.logged_in_email or 'no account'} ({reason} limit reached)")
+        if replace is None:
+            scraper.close()
+        else:
+            replace()
+        DRIVERS_RECYCLED.labels(reason).inc()
+        with self._lock:
+            self._stats["recycled"] += 1
+        return True
+
+    def total_rss(self) -> int:
+        """Resident memory of every tracked driver's process tree, in bytes"""
+        with self._lock:
+            records = list(self._drivers.values())
+        return sum(self._measure(record) for record in records)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get memory, age and usage of every tracked driver"""
+        with self._lock:
+            records = list(self._drivers.values())
+            counters = dict(self._stats)
+        now = time.time()
+        drivers = []
+        for record in records:
+            processes = _tree(record["pids"])
+            rss = _rss(processes)
+            record["peak_rss"] = max(record["peak_rss"], rss)
+            scraper = record["scraper"]
+            drivers.append({
+                "account": scraper.logged_in_email,
+                "profile_dir": scraper.profile_dir,
+                "pids": record["pids"],
+                "processes": len(processes),
+                "rss_mb": round(rss / MB, 1),
+                "peak_rss_mb": round(record["peak_rss"] / MB, 1),
+                "conversations": record["conversations"],
+                "age_seconds": round(now - record["started_at"]),
+            })
+        return {
+            "drivers": drivers,
+            "total_rss_mb": round(sum(d["rss_mb"] for d in drivers), 1),
+            "recycle_conversations": settings.driver_recycle_conversations,
+            "recycle_rss_mb": settings.driver_recycle_rss_mb,
+            **counters,
+        }
+
+    def find_orphans(self) -> List[psutil.Process]:
+        """Launched Chrome and chromedriver trees that no live owner will ever quit
+
+        Only processes recorded at launch are considered, so browsers of other
+        tools are never touched. A launch is orphaned once the process that
+        recorded it has exited, or when it was recorded by this process but
+        belongs to no tracked driver. Launches owned by another live process,
+        such as an account worker, are left alone, and so are processes
+        younger than driver_orphan_min_age that may still be registering.
+        """
+        with self._lock:
+            tracked = {process.pid for record in self._drivers.values()
+                       for process in _tree(record["pids"])}
+        own_pid = os.getpid()
+        cutoff = time.time() - settings.driver_orphan_min_age
+        orphans = []
+        for launch in self.launches.all():
+            process = _running(launch["pid"], launch["create_time"])
+            if process is None:
+                self.launches.remove(launch["pid"], launch["create_time"])
+                continue
+            owner_alive = _running(launch["owner_pid"], launch["owner_create_time"]) is not None
+            if owner_alive and launch["owner_pid"] != own_pid:
+                continue
+            if process.pid in tracked or launch["create_time"] > cutoff:
+                continue
+            orphans.append(process)
+        return orphans
+
+    def reap_orphans(self) -> int:
+        """Terminate orphaned automation browsers and drivers, returning how many trees were reaped"""
+        orphans = self.find_orphans()
+        if not orphans:
+            return 0
+        processes = _tree([orphan.pid for orphan in orphans])
+        for process in processes:
+            try:
+                process.terminate()
+            except psutil.Error:
+                continue
+        _, alive = psutil.wait_procs(processes, timeout=5)
+        for process in alive:
+            try:
+                process.kill()
+            except psutil.Error:
+                continue
+
+        ORPHANS_REAPED.inc(len(orphans))
+        with self._lock:
+            self._stats["orphans_reaped"] += len(orphans)
+        logger.warning(f"Reaped {len(orphans)} orphaned browser process trees "
+                       f"({len(processes)} processes)")
+        return len(orphans)
+
+    def start(self):
+        """Reap orphans now and then every driver_reap_interval seconds, on a background thread
+
+        Reaping waits up to 5 seconds for processes to exit, which must not hold up startup.
+        """
+        if self._reaper is not None:
+            return
+        self._stop.clear()
+        self._reaper = threading.Thread(target=self._reap_loop, name="orphan-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._reaper is not None:
+            self._reaper.join(timeout=10)
+            self._reaper = None
+
+    def _reap_loop(self):
+        while True:
+            try:
+                self.reap_orphans()
+            except Exception as e:
+                logger.error(f"Orphan reaping failed: {e}")
+            if not settings.driver_reap_interval or self._stop.wait(settings.driver_reap_interval):
+                return
+
+
+driver_lifecycle = DriverLifecycle()
+gauge_function(BROWSER_RSS, driver_lifecycle.total_rss)
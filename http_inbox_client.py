@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Optional
+import httpx
+from loguru import logger
+from inbox_backend import InboxBackend
+from models import ZillowMessage
+from zillow_selenium_scraper import ZillowSeleniumScraper
+from config import settings
+
+
+class HttpInboxBackend(InboxBackend):
+    """Lists the inbox over its JSON API using the browser session's cookies.
+
+    Listing never renders a page; opening conversations and sending
+    replies still go through the wrapped Selenium scraper.
+    """
+
+    def __init__(self, scraper: ZillowSeleniumScraper, client: Optional[httpx.Client] = None):
+        self.scraper = scraper
+        self.client = client or httpx.Client(
+            base_url=settings.zillow_base_url,
+            timeout=settings.inbox_api_timeout,
+            follow_redirects=False,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300),
+        )
+        self._cookies_synced = False
+        self._fell_back = False
+
+    def _sync_cookies(self):
+        """Copy the browser's cookies and user agent onto the HTTP client"""
+        driver = self.scraper.driver
+        self.client.cookies.clear()
+        for cookie in driver.get_cookies():
+            self.client.cookies.set(cookie["name"], cookie["value"],
+                                    domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        self.client.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+        self.client.headers["Accept"] = "application/json"
+        self._cookies_synced = True
+
+    def _fetch_conversations(self) -> List[Dict[str, Any]]:
+        """GET the conversation list, refreshing cookies from the browser once if rejected"""
+        for attempt in range(2):
+            if not self._cookies_synced or attempt:
+                self._sync_cookies()
+            response = self.client.get(settings.inbox_api_path, params={"unread_only": "true"})
+            if response.status_code in (401, 403) or response.is_redirect:
+                logger.info("Inbox API rejected the session cookies, resyncing from the browser")
+                continue
+            response.raise_for_status()
+            return response.json().get("conversations", [])
+        raise PermissionError("Inbox API rejected the browser session")
+
+    def _parse_conversation(self, conversation: Dict[str, Any]) -> Optional[ZillowMessage]:
+        """Turn one API conversation record into a ZillowMessage, or None if it is read"""
+        if not conversation.get("unread"):
+            return None
+        message_content = conversation.get("last_message") or ""
+        if conversation.get("last_message_from_you"):
+            message_content = f"You: {message_content}"
+        return self.scraper._build_message(
+            conversation_id=str(conversation["id"]),
+            prospect_name=conversation.get("prospect_name") or "Unknown",
+            message_content=message_content,
+            property_address=conversation.get("property_address")
+        )
+
+    def navigate_to_messages(self) -> bool:
+        # Listing needs no page, the browser is only navigated when replying
+        return True
+
+    def get_unread_messages(self, known_keys: Optional[List[str]] = None) -> List[ZillowMessage]:
+        """List unread conversations over HTTP, falling back to the rendered inbox"""
+        self._fell_back = False
+        try:
+            conversations = self._fetch_conversations()
+        except Exception as e:
+            logger.warning(f"Inbox API listing failed, falling back to the browser: {e}")
+            self._fell_back = True
+            self.scraper.navigate_to_messages()
+            return self.scraper.get_unread_messages(known_keys)
+
+        messages = [m for m in map(self._parse_conversation, conversations) if m]
+        logger.info(f"Found {len(messages)} unread messages via the inbox API")
+        return messages
+
+    def scanned_keys(self) -> List[str]:
+        # The API filters unread conversations server-side, only a browser scan walks the list
+        return self.scraper.scanned_keys() if self._fell_back else []
+
+    def open_conversation(self, conversation_url: str) -> bool:
+        # The scraper opens conversations by clicking them in the inbox list
+        if "rental-manager/inbox" not in self.scraper.driver.current_url:
+            self.scraper.navigate_to_messages()
+        return self.scraper.open_conversation(conversation_url)
+
+    def already_replied(self) -> bool:
+        return self.scraper.already_replied()
+
+    def send_reply(self, message: str) -> bool:
+        return self.scraper.send_reply(message)
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,39 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional
+from models import ZillowMessage
+
+
+class InboxBackend(ABC):
+    """Source of inbox conversations and the channel replies are sent through"""
+
+    @abstractmethod
+    def navigate_to_messages(self) -> bool:
+        """Get the inbox ready to be listed"""
+
+    @abstractmethod
+    def get_unread_messages(self, known_keys: Optional[List[str]] = None) -> List[ZillowMessage]:
+        """List conversations with unread messages
+
+        Backends that walk the inbox may stop at the first item whose key is
+        in known_keys, everything below it being unchanged since then.
+        """
+
+    def iter_unread_messages(self, known_keys: Optional[List[str]] = None) -> Iterator[ZillowMessage]:
+        """Yield unread conversations as they are found, by default from one listing"""
+        yield from self.get_unread_messages(known_keys)
+
+    def scanned_keys(self) -> List[str]:
+        """Keys of the inbox items the last listing walked, newest first"""
+        return []
+
+    @abstractmethod
+    def open_conversation(self, conversation_url: str) -> bool:
+        """Open a conversation so a reply can be sent to it"""
+
+    def already_replied(self) -> bool:
+        """Check whether the open conversation already has our reply, so sending would be refused"""
+        return False
+
+    @abstractmethod
+    def send_reply(self, message: str) -> bool:
+        """Send a reply in the currently open conversation"""
@@ -0,0 +1,178 @@
+import itertools
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from loguru import logger
+from models import JobStatus, MessageResponse, ProcessedMessage, ProcessingJob
+from config import settings
+
+
+class JobContext:
+    """Handle given to a running job for progress reporting and cancellation"""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.cancel_event = threading.Event()
+
+    def report_progress(self, processed: int, total: Optional[int]):
+        """Record how many of the job's messages have been handled, total unknown while scanning"""
+        self.queue._update(self.job_id, processed_messages=processed,
+                           total_messages=total)
+        self.queue._publish(self.job_id, "progress", {"processed": processed, "total": total})
+
+    def report_result(self, result: ProcessedMessage):
+        """Publish the outcome of one message to the job's event stream"""
+        self.queue._publish(self.job_id, "message", result.model_dump(mode="json"))
+
+
+class JobQueue:
+    """Runs message processing jobs on a dedicated worker executor"""
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 max_history: Optional[int] = None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.job_workers,
+            thread_name_prefix="processing-job"
+        )
+        self.max_history = max_history or settings.job_history_size
+        self._jobs: "OrderedDict[str, ProcessingJob]" = OrderedDict()
+        self._contexts: Dict[str, JobContext] = {}
+        self._futures: Dict[str, Future] = {}
+        self._events: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._event_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[[JobContext], MessageResponse]) -> ProcessingJob:
+        """Queue a processing function and return its job record immediately"""
+        job_id = uuid.uuid4().hex
+        job = ProcessingJob(job_id=job_id, created_at=datetime.now())
+        context = JobContext(self, job_id)
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._contexts[job_id] = context
+            self._publish_locked(job_id, "status", job.model_dump(mode="json"))
+            self._trim_history()
+            self._futures[job_id] = self._executor.submit(self._run, func, context)
+            return job.model_copy()
+
+    def _run(self, func: Callable[[JobContext], MessageResponse], context: JobContext):
+        """Execute a job on the worker thread and record its outcome"""
+        job_id = context.job_id
+        if context.cancel_event.is_set():
+            return
+        self._update(job_id, status=JobStatus.RUNNING, started_at=datetime.now())
+        logger.info(f"Job {job_id} started")
+
+        try:
+            result = func(context)
+            status = (JobStatus.CANCELLED if context.cancel_event.is_set()
+                      else JobStatus.COMPLETED)
+            self._update(job_id, status=status, result=result,
+                         finished_at=datetime.now())
+            logger.info(f"Job {job_id} {status.value}: {result.message}")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self._update(job_id, status=JobStatus.FAILED, error_message=str(e),
+                         finished_at=datetime.now())
+        finally:
+            with self._lock:
+                self._contexts.pop(job_id, None)
+                self._futures.pop(job_id, None)
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs[job_id] = job.model_copy(update=fields)
+                if "status" in fields:
+                    self._publish_locked(job_id, "status", self._jobs[job_id].model_dump(mode="json"))
+
+    def _publish(self, job_id: str, event: str, data: Dict[str, Any]):
+        with self._lock:
+            self._publish_locked(job_id, event, data)
+
+    def _publish_locked(self, job_id: str, event: str, data: Dict[str, Any]):
+        """Append to the job's bounded event log, oldest events fall off first"""
+        events = self._events.get(job_id)
+        if events is None:
+            events = self._events[job_id] = deque(maxlen=settings.job_event_history)
+        events.append({"id": next(self._event_ids), "event": event, "data": data})
+
+    def _trim_history(self):
+        """Drop the oldest finished jobs once the history limit is exceeded"""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status not in (JobStatus.QUEUED, JobStatus.RUNNING)]
+        excess = len(self._jobs) - self.max_history
+        for job_id in finished[:max(excess, 0)]:
+            del self._jobs[job_id]
+            self._events.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[ProcessingJob]:
+        """Get a snapshot of a job"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[ProcessingJob]:
+        """Block until a job has finished and get its final snapshot, None on timeout"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except TimeoutError:
+                return None
+            except CancelledError:
+                pass
+        return self.get(job_id)
+
+    def events(self, job_id: str, after: int = 0) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """Get a job's events newer than the given event id and whether the job has finished"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            events = [event for event in self._events.get(job_id, ()) if event["id"] > after]
+            return events, job.status not in (JobStatus.QUEUED, JobStatus.RUNNING)
+
+    def list(self) -> List[ProcessingJob]:
+        """Get snapshots of all tracked jobs, newest first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job or ask a running one to stop after its current message"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            context = self._contexts.get(job_id)
+            future = self._futures.get(job_id)
+            if job is None or context is None:
+                return False
+            context.cancel_event.set()
+            if future is not None and future.cancel():
+                self._jobs[job_id] = job.model_copy(update={
+                    "status": JobStatus.CANCELLED,
+                    "finished_at": datetime.now(),
+                })
+                self._publish_locked(job_id, "status", self._jobs[job_id].model_dump(mode="json"))
+                self._contexts.pop(job_id, None)
+                self._futures.pop(job_id, None)
+        logger.info(f"Cancellation requested for job {job_id}")
+        return True
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for or occupying a worker"""
+        with self._lock:
+            return len(self._futures)
+
+    def shutdown(self):
+        """Cancel pending jobs and stop running ones after their current message"""
+        with self._lock:
+            contexts = list(self._contexts.values())
+        for context in contexts:
+            self.cancel(context.job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
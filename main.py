@@ -1,23 +1,57 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+from contextlib import asynccontextmanager
+from datetime import datetime
 import asyncio
+import json
 from loguru import logger
 import sys
 
-from models import MessageResponse, ProcessedMessage, ZillowMessage
+from models import MessageResponse, MessageType, ProcessedMessage, ProcessingJob, SchedulerStatus, ZillowMessage
 from message_processor import MessageProcessor
+from message_classifier import MessageClassifier
+from batch_classifier import classify_byte_stream
+from browser_pool import BrowserPool
+from session_store import session_store
+from selector_registry import selector_registry
+from job_queue import JobContext, JobQueue
+from scheduler import PollingScheduler
+from account_scheduler import AccountScheduler, configured_accounts
+from metrics import CONTENT_TYPE_LATEST, QUEUE_DEPTH, gauge_function, render_metrics
+from tracing import trace_recorder
+from driver_lifecycle import driver_lifecycle
 from config import settings
 
 # Configure logging
 logger.remove()
 logger.add(sys.stdout, level="INFO", format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Reap orphaned browsers and start polling if enabled, and on exit stop queued work and close pooled browsers"""
+    driver_lifecycle.start()
+    if settings.scheduler_enabled:
+        if configured_accounts():
+            polling_scheduler.start()
+        else:
+            logger.warning("Polling scheduler not started, Zillow credentials not configured")
+    yield
+    polling_scheduler.stop()
+    job_queue.shutdown()
+    if account_scheduler is not None:
+        account_scheduler.shutdown()
+    browser_pool.close()
+    driver_lifecycle.stop()
+
 app = FastAPI(
     title="Zillow Message Auto-Reply API",
     description="Automated message processing and reply system for Zillow messages",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -29,8 +63,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global message processor instance
-message_processor = MessageProcessor()
+# Global browser pool and message processor instance
+browser_pool = BrowserPool()
+message_processor = MessageProcessor(pool=browser_pool)
+
+# Shared classifier, its keyword patterns are compiled once
+message_classifier = MessageClassifier()
+
+# Processing runs on worker threads so the event loop stays responsive
+job_queue = JobQueue()
+gauge_function(QUEUE_DEPTH, job_queue.queue_depth)
+
+# Several configured accounts are processed in parallel worker processes
+account_scheduler = AccountScheduler() if settings.zillow_accounts else None
+
+def _process_inbox(context: JobContext) -> MessageResponse:
+    """Process the configured account, or all of them in parallel, as one job"""
+    if account_scheduler is not None:
+        return account_scheduler.process_all(
+            progress_callback=context.report_progress,
+            cancel_event=context.cancel_event
+        )
+    return message_processor.process_unread_messages(
+        settings.zillow_email,
+        settings.zillow_password,
+        progress_callback=context.report_progress,
+        cancel_event=context.cancel_event,
+        result_callback=context.report_result
+    )
+
+# Polls the inbox on its own, reusing the pool's warm browsers between runs
+polling_scheduler = PollingScheduler(job_queue, _process_inbox)
 
 class LoginRequest(BaseModel):
     email: str
@@ -41,7 +104,12 @@ class ProcessMessagesRequest(BaseModel):
 
 class ProcessedMessagesResponse(BaseModel):
     processed_messages: List[ProcessedMessage]
-    total_count: int
+    next_cursor: Optional[int] = None
+    total_count: Optional[int] = None
+
+class JobsResponse(BaseModel):
+    jobs: List[ProcessingJob]
+    queue_depth: int
 
 @app.get("/")
 async def root():
@@ -57,6 +125,11 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "API is running"}
 
+def _check_login() -> bool:
+    """Lease a pooled browser and report whether it is logged in"""
+    with browser_pool.lease(settings.zillow_email, settings.zillow_password) as scraper:
+        return scraper.is_logged_in and scraper.logged_in_email == settings.zillow_email
+
 @app.post("/login", response_model=dict)
 async def login():
     """Test login credentials from .env file"""
@@ -67,13 +140,7 @@ async def login():
                 detail="Zillow credentials not configured in .env file"
             )
         
-        processor = MessageProcessor()
-        processor.scraper.initialize()
-        login_success = processor.scraper.login(
-            settings.zillow_email, 
-            settings.zillow_password
-        )
-        processor.scraper.close()
+        login_success = await run_in_threadpool(_check_login)
         
         if login_success:
             return {"success": True, "message": "Login successful"}
@@ -84,38 +151,176 @@ async def login():
         logger.error(f"Login error: {e}")
         raise HTTPException(status_code=500, detail=f"Login error: {str(e)}")
 
-@app.post("/process-messages", response_model=MessageResponse)
+@app.post("/process-messages", response_model=ProcessingJob, status_code=202)
 async def process_messages(request: ProcessMessagesRequest):
-    """Process unread messages and send automated replies"""
+    """Queue a run that processes unread messages and sends automated replies"""
     try:
-        if not settings.zillow_email or not settings.zillow_password:
+        if account_scheduler is not None:
+            logger.info(f"Queueing message processing for {len(account_scheduler.accounts)} accounts")
+        elif not settings.zillow_email or not settings.zillow_password:
             raise HTTPException(
                 status_code=400, 
                 detail="Zillow credentials not configured in .env file"
             )
+        else:
+            logger.info(f"Queueing message processing for {settings.zillow_email}")
         
-        logger.info(f"Starting message processing for {settings.zillow_email}")
-        
-        result = message_processor.process_unread_messages(
-            settings.zillow_email, 
-            settings.zillow_password
-        )
-        
-        logger.info(f"Message processing completed: {result.message}")
-        return result
+        return job_queue.submit(_process_inbox)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in process_messages endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing messages: {str(e)}")
 
+@app.get("/jobs", response_model=JobsResponse)
+async def list_jobs():
+    """List recent processing jobs"""
+    return JobsResponse(jobs=job_queue.list(), queue_depth=job_queue.queue_depth())
+
+@app.get("/jobs/{job_id}", response_model=ProcessingJob)
+async def get_job(job_id: str):
+    """Get the status, progress and result of a processing job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """Stream a job's progress, per-message results and status changes as server-sent events"""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    # Reconnecting EventSource clients resume after the last event they saw
+    try:
+        last_event_id = int(request.headers.get("last-event-id", 0))
+    except ValueError:
+        last_event_id = 0
+    
+    async def event_stream():
+        after = last_event_id
+        while not await request.is_disconnected():
+            snapshot = job_queue.events(job_id, after)
+            if snapshot is None:
+                return
+            events, finished = snapshot
+            for event in events:
+                after = event["id"]
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            if finished and not events:
+                return
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued job or stop a running one after its current message"""
+    if not job_queue.cancel(job_id):
+        raise HTTPException(status_code=404, detail=f"No active job {job_id}")
+    return {"success": True, "message": f"Cancellation requested for job {job_id}"}
+
+@app.get("/pool")
+async def get_pool_stats():
+    """Get browser pool occupancy and lifetime counters"""
+    return browser_pool.stats()
+
+@app.get("/browsers")
+async def get_browser_stats():
+    """Get memory, age and conversation count of every live browser, and recycle/reap counters"""
+    try:
+        return await run_in_threadpool(driver_lifecycle.stats)
+    except Exception as e:
+        logger.error(f"Error reading browser stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latencies, message and reply counters, browser and queue gauges"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/traces")
+async def list_traces(limit: int = Query(10, ge=1, le=100)):
+    """List the most recent run timelines, newest first"""
+    return {"traces": trace_recorder.list(limit)}
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Get a run timeline in Chrome trace-event format, for chrome://tracing or Perfetto"""
+    trace = trace_recorder.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
+    return trace
+
+@app.get("/sessions")
+async def get_session_stats():
+    """Get stored session age and restore hit/miss counters"""
+    return session_store.stats(settings.zillow_email)
+
+@app.get("/selectors")
+async def get_selector_stats():
+    """Get the winning selector and hit/miss counters per page type"""
+    return selector_registry.stats()
+
+@app.get("/scheduler", response_model=SchedulerStatus)
+async def get_scheduler_status():
+    """Get the polling scheduler state, current interval and last run"""
+    return polling_scheduler.status()
+
+@app.post("/scheduler/start", response_model=SchedulerStatus)
+async def start_scheduler():
+    """Start polling the inbox, beginning with an immediate run"""
+    if not configured_accounts():
+        raise HTTPException(
+            status_code=400,
+            detail="Zillow credentials not configured in .env file"
+        )
+    polling_scheduler.start()
+    return polling_scheduler.status()
+
+@app.post("/scheduler/stop", response_model=SchedulerStatus)
+async def stop_scheduler():
+    """Stop polling the inbox after the current run"""
+    polling_scheduler.stop()
+    return polling_scheduler.status()
+
 @app.get("/processed-messages", response_model=ProcessedMessagesResponse)
-async def get_processed_messages():
-    """Get list of processed messages"""
+async def get_processed_messages(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = None,
+    message_type: Optional[MessageType] = None,
+    response_sent: Optional[bool] = None,
+    conversation_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_total: bool = False
+):
+    """Get a page of processed messages, newest first"""
     try:
-        processed = message_processor.get_processed_messages()
+        filters = {
+            "message_type": message_type,
+            "response_sent": response_sent,
+            "conversation_id": conversation_id,
+            "since": since,
+            "until": until,
+        }
+        processed, next_cursor = await run_in_threadpool(
+            message_processor.get_processed_messages, limit, cursor, **filters
+        )
+        total_count = None
+        if include_total:
+            total_count = await run_in_threadpool(
+                message_processor.count_processed_messages, **filters
+            )
         return ProcessedMessagesResponse(
             processed_messages=processed,
-            total_count=len(processed)
+            next_cursor=next_cursor,
+            total_count=total_count
         )
     except Exception as e:
         logger.error(f"Error getting processed messages: {e}")
@@ -154,11 +359,8 @@ async def get_message_templates():
 async def test_message_classification(message_content: str, prospect_name: str = ""):
     """Test message classification without sending replies"""
     try:
-        from message_classifier import MessageClassifier
-        classifier = MessageClassifier()
-        
-        message_type = classifier.classify_message(message_content, prospect_name)
-        response_template = classifier.get_response_template(message_type, prospect_name)
+        message_type = message_classifier.classify_message(message_content, prospect_name)
+        response_template = message_classifier.get_response_template(message_type, prospect_name)
         
         return {
             "message_content": message_content,
@@ -170,6 +372,40 @@ async def test_message_classification(message_content: str, prospect_name: str =
         logger.error(f"Error in test classification: {e}")
         raise HTTPException(status_code=500, detail=f"Error testing classification: {str(e)}")
 
+class _BodyStreamingResponse(StreamingResponse):
+    """A streaming response produced while the request body is still being read
+
+    StreamingResponse watches for a disconnect by calling receive() itself,
+    which takes the body messages away from request.stream() and leaves the
+    response waiting forever. The watch starts once the body is read instead.
+    """
+
+    def __init__(self, content, body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self._body_read = body_read
+
+    async def listen_for_disconnect(self, receive):
+        await self._body_read.wait()
+        await super().listen_for_disconnect(receive)
+
+async def _request_body(request: Request, body_read: asyncio.Event):
+    """The request body as it arrives, setting body_read once it has all been read"""
+    try:
+        async for chunk in request.stream():
+            yield chunk
+    finally:
+        body_read.set()
+
+@app.post("/classify-batch")
+async def classify_batch(request: Request):
+    """Classify an NDJSON or JSON array body, streaming NDJSON results as they are produced"""
+    body_read = asyncio.Event()
+    return _BodyStreamingResponse(
+        classify_byte_stream(_request_body(request, body_read), message_classifier),
+        body_read,
+        media_type="application/x-ndjson"
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,47 +1,89 @@
+import re
+from typing import Dict, List, Pattern, Set, Tuple
 from models import MessageType
 from config import settings
 
 
+# Keyword categories checked in order of priority, first hit wins
+CATEGORY_PRIORITY: List[Tuple[str, MessageType]] = [
+    ("tour_requested", MessageType.TOUR_REQUESTED),
+    ("application_requested", MessageType.APPLICATION_REQUESTED),
+    ("homebase_section8", MessageType.HOMEBASE_SECTION8),
+    ("pet_policy", MessageType.PET_POLICY),
+]
+
+HOMEBASE_RAFT_PATTERN = re.compile(r"\b(?:homebase|raft)\b")
+
+
 class MessageClassifier:
     """Classifies Zillow messages based on content and keywords"""
     
     def __init__(self):
         self.keywords = settings.message_keywords
+        self._keyword_categories, self._pattern = self._compile_keywords(self.keywords)
+    
+    @staticmethod
+    def _compile_keywords(keywords: Dict[str, List[str]]) -> Tuple[Dict[str, Set[str]], Pattern]:
+        """Compile the keyword table into one word-bounded regex"""
+        keyword_categories: Dict[str, Set[str]] = {}
+        for category, category_keywords in keywords.items():
+            for keyword in category_keywords:
+                normalized = " ".join(keyword.lower().split())
+                keyword_categories.setdefault(normalized, set()).add(category)
+        
+        pattern = MessageClassifier._trie_regex(list(keyword_categories))
+        return keyword_categories, re.compile(r"\b(" + pattern + r")s?\b")
+    
+    @staticmethod
+    def _trie_regex(keywords: List[str]) -> str:
+        """Build a regex from a prefix trie so shared prefixes are only matched once"""
+        trie: Dict[str, dict] = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        
+        def build(node: Dict[str, dict]) -> str:
+            branches = [
+                (r"\s+" if char == " " else re.escape(char)) + build(child)
+                for char, child in sorted(node.items()) if char
+            ]
+            if not branches:
+                return ""
+            if "" in node:
+                return "(?:" + "|".join(branches) + ")?"
+            if len(branches) == 1:
+                return branches[0]
+            return "(?:" + "|".join(branches) + ")"
+        
+        return build(trie)
+    
+    def matched_categories(self, message_content: str) -> Set[str]:
+        """Get every keyword category that appears in the message, in one pass"""
+        categories: Set[str] = set()
+        for keyword in self._pattern.findall(message_content.lower()):
+            matched = self._keyword_categories.get(keyword)
+            if matched is None:
+                matched = self._keyword_categories[" ".join(keyword.split())]
+            categories |= matched
+        return categories
     
     def classify_message(self, message_content: str, 
                         prospect_name: str = "") -> MessageType:
         """
         Classify a message based on its content
         """
-        content_lower = message_content.lower()
+        categories = self.matched_categories(message_content)
         
         # Check for specific message types in order of priority
-        if self._contains_keywords(content_lower, 
-                                  self.keywords["tour_requested"]):
-            return MessageType.TOUR_REQUESTED
-            
-        if self._contains_keywords(content_lower, 
-                                  self.keywords["application_requested"]):
-            return MessageType.APPLICATION_REQUESTED
-            
-        if self._contains_keywords(content_lower, 
-                                  self.keywords["homebase_section8"]):
-            return MessageType.HOMEBASE_SECTION8
-            
-        if self._contains_keywords(content_lower, 
-                                  self.keywords["pet_policy"]):
-            return MessageType.PET_POLICY
+        for category, message_type in CATEGORY_PRIORITY:
+            if category in categories:
+                return message_type
             
         # Default to general inquiry
         return MessageType.GENERAL_INQUIRY
     
-    def _contains_keywords(self, content: str, keywords: list) -> bool:
-        """Check if content contains any of the specified keywords"""
-        for keyword in keywords:
-            if keyword in content:
-                return True
-        return False
-    
     def get_response_template(self, message_type: MessageType, 
                             prospect_name: str = "") -> str:
         """Get the appropriate response template based on message type"""
@@ -67,6 +109,5 @@ class MessageClassifier:
     def should_include_homebase_raft(self, message_type: MessageType, 
                                     content: str) -> bool:
         """Determine if homebase/raft specific info should be included"""
-        content_lower = content.lower()
         return (message_type == MessageType.HOMEBASE_SECTION8 and 
-                any(keyword in content_lower for keyword in ["homebase", "raft"]))
+                HOMEBASE_RAFT_PATTERN.search(content.lower()) is not None)
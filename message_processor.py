@@ -1,149 +1,429 @@
 import asyncio
-from typing import List, Optional
+import itertools
+import random
+import threading
+import weakref
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from loguru import logger
-from models import ZillowMessage, ProcessedMessage, MessageResponse, MessageStatus
+from models import ZillowMessage, ProcessedMessage, MessageResponse, MessageStatus, MessageType
 from message_classifier import MessageClassifier
 from zillow_selenium_scraper import ZillowSeleniumScraper
+from inbox_backend import InboxBackend
+from http_inbox_client import HttpInboxBackend
+from browser_pool import BrowserPool
+from metrics import MESSAGE_RETRIES, MESSAGES_CLASSIFIED, REPLIES_FAILED, REPLIES_SENT
+from tracing import span, trace_recorder, traced_sleep
+from driver_lifecycle import driver_lifecycle
+from message_store import HandledConversationIndex, InboxWatermarkIndex, ProcessedMessageStore, RunCheckpoint
 from config import settings
 
 class MessageProcessor:
     """Handles message processing and automated replies"""
     
-    def __init__(self):
+    def __init__(self, pool: Optional[BrowserPool] = None,
+                 store: Optional[ProcessedMessageStore] = None,
+                 handled_index: Optional[HandledConversationIndex] = None,
+                 watermarks: Optional[InboxWatermarkIndex] = None,
+                 checkpoint: Optional[RunCheckpoint] = None):
         self.classifier = MessageClassifier()
-        self.scraper = ZillowSeleniumScraper()
-        self.processed_messages = []
+        self.pool = pool or BrowserPool()
+        self.store = store or ProcessedMessageStore()
+        self.handled_index = handled_index or HandledConversationIndex()
+        self.watermarks = watermarks or InboxWatermarkIndex()
+        self.checkpoint = checkpoint or RunCheckpoint()
+        self._http_backends: "weakref.WeakKeyDictionary[ZillowSeleniumScraper, HttpInboxBackend]" = (
+            weakref.WeakKeyDictionary()
+        )
     
-    def process_unread_messages(self, email: str, password: str) -> MessageResponse:
-        """Process all unread messages and send appropriate replies"""
+    def _backend_for(self, scraper: ZillowSeleniumScraper) -> InboxBackend:
+        """Pick the configured inbox backend for a leased scraper"""
+        if settings.inbox_backend != "http":
+            return scraper
+        # Keep one HTTP client per browser so its keep-alive connections are reused
+        backend = self._http_backends.get(scraper)
+        if backend is None:
+            backend = self._http_backends[scraper] = HttpInboxBackend(scraper)
+        return backend
+    
+    def process_unread_messages(self, email: str, password: str,
+                                progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+                                cancel_event: Optional[threading.Event] = None,
+                                result_callback: Optional[Callable[[ProcessedMessage], None]] = None
+                                ) -> MessageResponse:
+        """Process unread messages as the inbox scan finds them and send appropriate replies"""
         try:
-            # Initialize scraper and login
-            self.scraper.initialize()
-            login_success = self.scraper.login(email, password)
-            
-            if not login_success:
-                return MessageResponse(
-                    success=False,
-                    message="Failed to login to Zillow",
-                    errors=["Login failed"]
-                )
-            
-            # Get unread messages
-            unread_messages = self.scraper.get_unread_messages()
-            
-            if not unread_messages:
+            # Lease a warm, logged-in browser from the pool, recording the run's timeline
+            with trace_recorder.record("process_unread_messages", account=email), \
+                    self.pool.lease(email, password) as scraper:
+                if not scraper.is_logged_in or scraper.logged_in_email != email:
+                    return MessageResponse(
+                        success=False,
+                        message="Failed to login to Zillow",
+                        errors=["Login failed"]
+                    )
+                
+                backend = self._backend_for(scraper)
+                known_keys = self.watermarks.known_keys(email) if settings.incremental_inbox_scan else None
+                
+                total: Optional[int] = None
+                if settings.pipelined_processing:
+                    # Pipelining renders the whole batch up front and works in other tabs, scan first
+                    backend.navigate_to_messages()
+                    resumed = self.checkpoint.pending(email)
+                    resumed_ids = {message.id for message in resumed}
+                    batch = resumed + [m for m in self._skip_handled(backend.iter_unread_messages(known_keys))
+                                       if m.id not in resumed_ids]
+                    total = len(batch)
+                    logger.info(f"Found {total} unread messages to process")
+                    self.checkpoint.add(email, batch)
+                    replies = work = self._pipelined_work(email, password, scraper, backend, batch)
+                else:
+                    # Stream unread messages, the scan yields them as it walks the inbox
+                    replies = work = self._streamed_replies(email, password, scraper, known_keys)
+                
+                handled = 0
+                replies_sent = 0
+                processed_count = 0
+                failed = 0
+                errors = []
+                pending: List[ProcessedMessage] = []
+                if progress_callback:
+                    progress_callback(0, total)
+                
+                try:
+                    for message, result in work:
+                        handled += 1
+                        if result:
+                            processed_count += 1
+                            replies_sent += result.response_sent
+                            pending.append(result)
+                            if not result.response_sent and not result.already_replied:
+                                failed += 1
+                            if result_callback:
+                                result_callback(result)
+                        else:
+                            error_msg = f"Failed to process message {message.id}"
+                            logger.error(error_msg)
+                            errors.append(error_msg)
+                        
+                        if len(pending) >= settings.message_store_batch_size:
+                            with span("store_flush", messages=len(pending)):
+                                self.store.add_many(pending)
+                            pending = []
+                        
+                        if progress_callback:
+                            progress_callback(handled, total)
+                        
+                        if cancel_event is not None and cancel_event.is_set():
+                            logger.info(f"Processing cancelled after {handled} messages")
+                            return MessageResponse(
+                                success=False,
+                                message=f"Cancelled after processing {processed_count} messages",
+                                processed_count=processed_count,
+                                replies_sent=replies_sent,
+                                errors=errors
+                            )
+                finally:
+                    if replies is not None:
+                        replies.close()
+                    # Whatever happened, keep the record of what was already sent
+                    self.store.add_many(pending)
+                
+                if progress_callback:
+                    progress_callback(handled, handled)
+                
+                # Only a run that answered everything it saw may move the watermark past it
+                if not errors and not failed:
+                    self._advance_watermark(email, backend)
+                
+                if not handled:
+                    return MessageResponse(
+                        success=True,
+                        message="No unread messages found",
+                        processed_count=0
+                    )
+                
                 return MessageResponse(
                     success=True,
-                    message="No unread messages found",
-                    processed_count=0
+                    message=f"Processed {processed_count} messages successfully",
+                    processed_count=processed_count,
+                    replies_sent=replies_sent,
+                    errors=errors
                 )
             
-            logger.info(f"Found {len(unread_messages)} unread messages to process")
-            
-            processed_count = 0
-            errors = []
-            
-            for message in unread_messages:
-                try:
-                    result = self._process_single_message(message)
-                    if result:
-                        processed_count += 1
-                        self.processed_messages.append(result)
-                except Exception as e:
-                    error_msg = f"Failed to process message {message.id}: {str(e)}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-            
-            self.scraper.close()
-            
-            return MessageResponse(
-                success=True,
-                message=f"Processed {processed_count} messages successfully",
-                processed_count=processed_count,
-                errors=errors
-            )
-            
         except Exception as e:
             logger.error(f"Error in process_unread_messages: {e}")
-            self.scraper.close()
             return MessageResponse(
                 success=False,
                 message=f"Error processing messages: {str(e)}",
                 errors=[str(e)]
             )
     
-    def _process_single_message(self, message: ZillowMessage) -> Optional[ProcessedMessage]:
+    def _streamed_replies(self, email: str, password: str, scraper: ZillowSeleniumScraper,
+                          known_keys: Optional[List[str]]) -> Iterator[Tuple[ZillowMessage, ProcessedMessage]]:
+        """Process messages as the scan finds them, carrying on in a replacement browser if the driver dies
+        
+        Unfinished conversations of an interrupted run come first, straight
+        from the checkpoint. After a browser is replaced the scan starts over
+        and skips every conversation this run already finished.
+        """
+        finished: Set[str] = set()
+        restarts = 0
+        while True:
+            scan_driver = scraper.driver
+            try:
+                backend = self._backend_for(scraper)
+                backend.navigate_to_messages()
+                resumed = [m for m in self.checkpoint.pending(email) if m.id not in finished]
+                if resumed:
+                    logger.info(f"Resuming {len(resumed)} unfinished conversations of an interrupted run")
+                scanned = self._skip_handled(backend.iter_unread_messages(known_keys))
+                for message in itertools.chain(resumed, scanned):
+                    if message.id in finished:
+                        continue
+                    self.checkpoint.add(email, [message])
+                    result = self._process_single_message(backend, message)
+                    result = self._finish_message(email, password, scraper, message, result)
+                    finished.add(message.id)
+                    yield message, result
+                    self._recycle_if_needed(email, password, scraper)
+                    if scraper.driver is not scan_driver:
+                        # A retry or recycle replaced the browser, the scan was walking the old one
+                        break
+                else:
+                    return
+            except Exception as e:
+                if scraper.is_alive() or restarts >= settings.max_retries:
+                    raise
+                restarts += 1
+                logger.warning(f"Browser died during the run, continuing in a replacement: {e}")
+                self.pool.restart(scraper, email, password)
+    
+    def _pipelined_work(self, email: str, password: str, scraper: ZillowSeleniumScraper,
+                        backend: InboxBackend, batch: List[ZillowMessage]
+                        ) -> Iterator[Tuple[ZillowMessage, ProcessedMessage]]:
+        """Pipelined replies for a listed batch, one at a time after the browser is recycled"""
+        if not batch:
+            return
+        replies = self._pipelined_replies(scraper, backend, batch)
+        try:
+            for index, (message, result) in enumerate(zip(batch, replies)):
+                yield message, self._finish_message(email, password, scraper, message, result)
+                if self._recycle_if_needed(email, password, scraper):
+                    # The prefetched tabs belonged to the old browser
+                    replies.close()
+                    for message in batch[index + 1:]:
+                        result = self._process_single_message(self._backend_for(scraper), message)
+                        yield message, self._finish_message(email, password, scraper, message, result)
+                        self._recycle_if_needed(email, password, scraper)
+                    return
+        finally:
+            replies.close()
+    
+    def _recycle_if_needed(self, email: str, password: str, scraper: ZillowSeleniumScraper) -> bool:
+        """Swap in a fresh browser between conversations once the current one reached a recycle limit"""
+        def replace():
+            self.pool.restart(scraper, email, password)
+            self._backend_for(scraper).navigate_to_messages()
+        return driver_lifecycle.recycle_if_needed(scraper, replace)
+    
+    def _finish_message(self, email: str, password: str, scraper: ZillowSeleniumScraper,
+                        message: ZillowMessage, result: ProcessedMessage) -> ProcessedMessage:
+        """Retry a transiently failed message with exponential backoff, then take it off the checkpoint
+        
+        A dead browser is replaced before the next attempt. Retrying cannot
+        send a reply twice, a conversation showing our reply is answered as
+        already replied instead.
+        """
+        for attempt in range(1, settings.max_retries + 1):
+            if not self._is_transient_failure(result):
+                break
+            delay = min(settings.retry_backoff * 2 ** (attempt - 1), settings.retry_backoff_max)
+            delay *= random.uniform(0.75, 1.25)
+            logger.warning(f"Retrying message {message.id} in {delay:.1f}s "
+                           f"(attempt {attempt}/{settings.max_retries}): {result.error_message}")
+            MESSAGE_RETRIES.inc()
+            traced_sleep(delay)
+            try:
+                if not scraper.is_alive():
+                    self.pool.restart(scraper, email, password)
+                    self._backend_for(scraper).navigate_to_messages()
+            except Exception as e:
+                logger.error(f"Failed to replace the browser: {e}")
+                result = self._result(message, result.message_type, error_message=str(e))
+                continue
+            result = self._process_single_message(self._backend_for(scraper), message)
+        self.checkpoint.finish(email, message.id)
+        self._count_outcome(result)
+        return result
+    
+    @staticmethod
+    def _count_outcome(result: ProcessedMessage):
+        """Count a message's final outcome once, however many attempts it took"""
+        if result.message_type is not None:
+            MESSAGES_CLASSIFIED.labels(result.message_type.value).inc()
+        if result.response_sent:
+            REPLIES_SENT.inc()
+        elif not result.already_replied:
+            REPLIES_FAILED.inc()
+    
+    @staticmethod
+    def _is_transient_failure(result: ProcessedMessage) -> bool:
+        """Whether a failed result is worth another attempt
+        
+        Browser failures are; a reply that could not be prepared (it has no
+        message type) or a conversation we already answered are not.
+        """
+        return not result.response_sent and not result.already_replied and result.message_type is not None
+    
+    def _advance_watermark(self, email: str, backend: InboxBackend):
+        """Remember the inbox items this run scanned so the next scan can stop at them"""
+        if settings.incremental_inbox_scan:
+            self.watermarks.advance(email, backend.scanned_keys())
+    
+    def _skip_handled(self, messages: Iterable[ZillowMessage]) -> Iterator[ZillowMessage]:
+        """Drop conversations whose latest message was already answered, before any navigation"""
+        skipped = 0
+        for message in messages:
+            if message.conversation_id and message.message_digest and self.handled_index.is_handled(
+                message.conversation_id, message.message_digest
+            ):
+                skipped += 1
+                continue
+            yield message
+        if skipped:
+            logger.info(f"Skipped {skipped} conversations that were already answered")
+    
+    def _prepare_reply(self, message: ZillowMessage) -> Tuple[MessageType, str]:
+        """Classify a message and render its complete reply, no DOM work involved"""
+        # Classify the message
+        message_type = self.classifier.classify_message(
+            message.message_content, 
+            message.prospect_name
+        )
+        
+        # Get response template
+        response_template = self.classifier.get_response_template(
+            message_type, 
+            message.prospect_name
+        )
+        
+        # Add additional information if needed
+        full_response = self._build_complete_response(
+            response_template, 
+            message_type, 
+            message.message_content,
+            message.prospect_name
+        )
+        return message_type, full_response
+    
+    def _process_single_message(self, backend: InboxBackend,
+                                message: ZillowMessage) -> Optional[ProcessedMessage]:
         """Process a single message and send appropriate reply"""
+        message_type = None
         try:
-            # Classify the message
-            message_type = self.classifier.classify_message(
-                message.message_content, 
-                message.prospect_name
-            )
-            
-            logger.info(f"Processing message from {message.prospect_name} - Type: {message_type}")
-            
-            # Get response template
-            response_template = self.classifier.get_response_template(
-                message_type, 
-                message.prospect_name
-            )
-            
-            # Add additional information if needed
-            full_response = self._build_complete_response(
-                response_template, 
-                message_type, 
-                message.message_content,
-                message.prospect_name
-            )
-            
-            # Open conversation and send reply
-            conversation_opened = self.scraper.open_conversation(message.conversation_url)
-            
-            if not conversation_opened:
-                logger.error(f"Failed to open conversation for message {message.id}")
-                return ProcessedMessage(
-                    message_id=message.id,
-                    prospect_name=message.prospect_name,
-                    message_type=message_type,
-                    response_sent=False,
-                    timestamp=message.timestamp,
-                    error_message="Failed to open conversation"
-                )
-            
-            # Send the reply
-            reply_sent = self.scraper.send_reply(full_response)
-            
-            if reply_sent:
-                logger.info(f"Successfully sent reply to {message.prospect_name}")
-                return ProcessedMessage(
-                    message_id=message.id,
-                    prospect_name=message.prospect_name,
-                    message_type=message_type,
-                    response_sent=True,
-                    timestamp=message.timestamp
-                )
-            else:
-                logger.error(f"Failed to send reply to {message.prospect_name}")
-                return ProcessedMessage(
-                    message_id=message.id,
-                    prospect_name=message.prospect_name,
-                    message_type=message_type,
-                    response_sent=False,
-                    timestamp=message.timestamp,
-                    error_message="Failed to send reply"
-                )
+            with span("message", conversation_id=message.conversation_id):
+                with span("prepare_reply"):
+                    message_type, full_response = self._prepare_reply(message)
                 
+                # Open conversation and send reply
+                with span("open_conversation"):
+                    conversation_opened = backend.open_conversation(message.conversation_url)
+                return self._deliver_reply(backend, message, message_type, full_response, conversation_opened)
         except Exception as e:
             logger.error(f"Error processing message {message.id}: {e}")
-            return ProcessedMessage(
-                message_id=message.id,
-                prospect_name=message.prospect_name,
-                message_type=message_type if 'message_type' in locals() else None,
-                response_sent=False,
-                timestamp=message.timestamp,
-                error_message=str(e)
-            )
+            return self._result(message, message_type, error_message=str(e))
+    
+    def _pipelined_replies(self, scraper: ZillowSeleniumScraper, backend: InboxBackend,
+                           messages: List[ZillowMessage]) -> Iterator[ProcessedMessage]:
+        """Yield one result per message while the next conversation loads in a second tab"""
+        # Classification and rendering need no browser, do the whole batch up front
+        prepared: List[Optional[Tuple[MessageType, str]]] = []
+        with span("prepare_replies", messages=len(messages)):
+            for message in messages:
+                try:
+                    prepared.append(self._prepare_reply(message))
+                except Exception as e:
+                    logger.error(f"Error preparing reply for message {message.id}: {e}")
+                    prepared.append(None)
+        
+        home = scraper.driver.current_window_handle
+        tabs: Dict[int, Optional[str]] = {}
+        try:
+            tabs[0] = scraper.open_conversation_tab(messages[0].conversation_url)
+            for index, message in enumerate(messages):
+                handle = tabs.pop(index)
+                message_type = None
+                try:
+                    with span("message", conversation_id=message.conversation_id):
+                        with span("switch_to_conversation_tab"):
+                            opened = handle is not None and scraper.switch_to_conversation_tab(
+                                handle, message.conversation_id
+                            )
+                        # The next conversation loads while this reply is typed and confirmed
+                        if index + 1 < len(messages):
+                            with span("open_conversation_tab"):
+                                tabs[index + 1] = scraper.open_conversation_tab(
+                                    messages[index + 1].conversation_url
+                                )
+                        if prepared[index] is None:
+                            raise ValueError("Failed to prepare reply")
+                        message_type, full_response = prepared[index]
+                        result = self._deliver_reply(backend, message, message_type, full_response, opened)
+                except Exception as e:
+                    logger.error(f"Error processing message {message.id}: {e}")
+                    result = self._result(message, message_type, error_message=str(e))
+                if handle:
+                    scraper.close_conversation_tab(handle, home)
+                yield result
+        finally:
+            # Cancelled or failed runs leave no stray tabs behind
+            for handle in tabs.values():
+                if handle:
+                    scraper.close_conversation_tab(handle, home)
+    
+    def _deliver_reply(self, backend: InboxBackend, message: ZillowMessage, message_type: MessageType,
+                       full_response: str, conversation_opened: bool) -> ProcessedMessage:
+        """Send a prepared reply in the opened conversation and record the outcome"""
+        logger.info(f"Processing message from {message.prospect_name} - Type: {message_type}")
+        
+        if not conversation_opened:
+            logger.error(f"Failed to open conversation for message {message.id}")
+            return self._result(message, message_type, error_message="Failed to open conversation")
+        
+        if backend.already_replied():
+            # Sending would be refused every time, do not count it as a failure
+            logger.info(f"Conversation with {message.prospect_name} already has our reply, nothing sent")
+            if message.conversation_id and message.message_digest:
+                self.handled_index.mark_handled(message.conversation_id, message.message_digest)
+            return self._result(message, message_type, error_message="Already replied", already_replied=True)
+        
+        # Send the reply
+        with span("send_reply", characters=len(full_response)):
+            reply_sent = backend.send_reply(full_response)
+        
+        if reply_sent:
+            logger.info(f"Successfully sent reply to {message.prospect_name}")
+            if message.conversation_id and message.message_digest:
+                self.handled_index.mark_handled(message.conversation_id, message.message_digest)
+            return self._result(message, message_type)
+        else:
+            logger.error(f"Failed to send reply to {message.prospect_name}")
+            return self._result(message, message_type, error_message="Failed to send reply")
+    
+    @staticmethod
+    def _result(message: ZillowMessage, message_type: Optional[MessageType],
+                error_message: Optional[str] = None, already_replied: bool = False) -> ProcessedMessage:
+        return ProcessedMessage(
+            message_id=message.id,
+            conversation_id=message.conversation_id,
+            prospect_name=message.prospect_name,
+            message_type=message_type,
+            response_sent=error_message is None,
+            timestamp=message.timestamp,
+            error_message=error_message,
+            already_replied=already_replied
+        )
     
     def _build_complete_response(self, base_response: str, message_type, content: str, prospect_name: str) -> str:
         """Build a complete response with additional information if needed"""
@@ -161,10 +441,15 @@ class MessageProcessor:
         
         return "\n".join(response_parts)
     
-    def get_processed_messages(self) -> List[ProcessedMessage]:
-        """Get list of processed messages"""
-        return self.processed_messages
+    def get_processed_messages(self, limit: int = 50, cursor: Optional[int] = None,
+                               **filters) -> Tuple[List[ProcessedMessage], Optional[int]]:
+        """Get a page of processed messages and the cursor for the next page"""
+        return self.store.query(limit=limit, cursor=cursor, **filters)
+    
+    def count_processed_messages(self, **filters) -> int:
+        """Count processed messages matching the filters"""
+        return self.store.count(**filters)
     
     def clear_processed_messages(self):
-        """Clear the list of processed messages"""
-        self.processed_messages = []
+        """Clear the processed message history"""
+        self.store.clear()
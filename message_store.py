@@ -0,0 +1,359 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+from models import MessageType, ProcessedMessage, ZillowMessage
+from config import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT NOT NULL,
+    conversation_id TEXT,
+    prospect_name TEXT NOT NULL,
+    message_type TEXT,
+    response_sent INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    error_message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_processed_messages_message_id
+    ON processed_messages (message_id);
+CREATE INDEX IF NOT EXISTS idx_processed_messages_conversation_id
+    ON processed_messages (conversation_id);
+CREATE INDEX IF NOT EXISTS idx_processed_messages_type
+    ON processed_messages (message_type, id);
+CREATE INDEX IF NOT EXISTS idx_processed_messages_timestamp
+    ON processed_messages (timestamp);
+"""
+
+HANDLED_CONVERSATIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS handled_conversations (
+    conversation_id TEXT PRIMARY KEY,
+    message_digest TEXT NOT NULL,
+    handled_at TEXT NOT NULL
+);
+"""
+
+INBOX_WATERMARKS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inbox_watermarks (
+    account TEXT PRIMARY KEY,
+    item_keys TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+RUN_CHECKPOINTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_checkpoints (
+    account TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (account, message_id)
+);
+"""
+
+LAUNCHED_DRIVERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS launched_drivers (
+    pid INTEGER NOT NULL,
+    create_time REAL NOT NULL,
+    owner_pid INTEGER NOT NULL,
+    owner_create_time REAL NOT NULL,
+    PRIMARY KEY (pid, create_time)
+);
+"""
+
+
+class SQLiteStore:
+    """Shared plumbing for the SQLite-backed stores: WAL mode, one connection per thread"""
+
+    schema = ""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.message_store_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(self.schema)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class ProcessedMessageStore(SQLiteStore):
+    """Durable, indexed history of processed messages"""
+
+    schema = SCHEMA
+
+    def add(self, message: ProcessedMessage):
+        """Record a single processed message"""
+        self.add_many([message])
+
+    def add_many(self, messages: Iterable[ProcessedMessage]):
+        """Record a batch of processed messages in one transaction"""
+        rows = [
+            (
+                m.message_id,
+                m.conversation_id,
+                m.prospect_name,
+                m.message_type.value if m.message_type else None,
+                int(m.response_sent),
+                m.timestamp.isoformat(),
+                m.error_message,
+            )
+            for m in messages
+        ]
+        if not rows:
+            return
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT INTO processed_messages (message_id, conversation_id, prospect_name, "
+                "message_type, response_sent, timestamp, error_message) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        logger.debug(f"Stored {len(rows)} processed messages")
+
+    def _filters(self, message_type: Optional[MessageType] = None,
+                 response_sent: Optional[bool] = None,
+                 conversation_id: Optional[str] = None,
+                 since: Optional[datetime] = None,
+                 until: Optional[datetime] = None) -> Tuple[List[str], List]:
+        clauses, params = [], []
+        if message_type is not None:
+            clauses.append("message_type = ?")
+            params.append(message_type.value)
+        if response_sent is not None:
+            clauses.append("response_sent = ?")
+            params.append(int(response_sent))
+        if conversation_id is not None:
+            clauses.append("conversation_id = ?")
+            params.append(conversation_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until.isoformat())
+        return clauses, params
+
+    def query(self, limit: int = 50, cursor: Optional[int] = None,
+              **filters) -> Tuple[List[ProcessedMessage], Optional[int]]:
+        """Get a page of messages, newest first, and the cursor for the next page"""
+        clauses, params = self._filters(**filters)
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        rows = self._connection().execute(
+            f"SELECT * FROM processed_messages {where} ORDER BY id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return [self._to_model(row) for row in rows[:limit]], next_cursor
+
+    def count(self, **filters) -> int:
+        """Count stored messages matching the filters"""
+        clauses, params = self._filters(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._connection().execute(
+            f"SELECT COUNT(*) FROM processed_messages {where}", params
+        ).fetchone()[0]
+
+    def clear(self):
+        """Delete the whole processed message history"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM processed_messages")
+
+    @staticmethod
+    def _to_model(row: sqlite3.Row) -> ProcessedMessage:
+        return ProcessedMessage(
+            message_id=row["message_id"],
+            conversation_id=row["conversation_id"],
+            prospect_name=row["prospect_name"],
+            message_type=row["message_type"],
+            response_sent=bool(row["response_sent"]),
+            timestamp=datetime.fromisoformat(row["timestamp"]),
+            error_message=row["error_message"],
+        )
+
+
+class HandledConversationIndex(SQLiteStore):
+    """Remembers the last message each conversation was answered for"""
+
+    schema = HANDLED_CONVERSATIONS_SCHEMA
+
+    def handled_digests(self, conversation_ids: List[str]) -> Dict[str, str]:
+        """Get the last answered message digest for each known conversation"""
+        digests: Dict[str, str] = {}
+        conn = self._connection()
+        # Stay well under SQLite's bound parameter limit
+        for start in range(0, len(conversation_ids), 500):
+            chunk = conversation_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                "SELECT conversation_id, message_digest FROM handled_conversations "
+                f"WHERE conversation_id IN ({placeholders})",
+                chunk
+            ).fetchall()
+            digests.update({row["conversation_id"]: row["message_digest"] for row in rows})
+        return digests
+
+    def is_handled(self, conversation_id: str, message_digest: str) -> bool:
+        """Check whether this exact last message was already answered"""
+        return self.handled_digests([conversation_id]).get(conversation_id) == message_digest
+
+    def mark_handled(self, conversation_id: str, message_digest: str):
+        """Record that the conversation's current last message has been answered"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO handled_conversations (conversation_id, message_digest, handled_at) "
+                "VALUES (?, ?, ?) ON CONFLICT(conversation_id) DO UPDATE SET "
+                "message_digest = excluded.message_digest, handled_at = excluded.handled_at",
+                (conversation_id, message_digest, datetime.now().isoformat())
+            )
+
+    def clear(self):
+        """Forget every handled conversation"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM handled_conversations")
+
+
+class InboxWatermarkIndex(SQLiteStore):
+    """Per-account keys of the newest inbox items already scanned, newest first"""
+
+    schema = INBOX_WATERMARKS_SCHEMA
+
+    @staticmethod
+    def _account(email: str) -> str:
+        return email.strip().lower()
+
+    def known_keys(self, email: str) -> List[str]:
+        """Get the item keys recorded by the account's last clean scan"""
+        row = self._connection().execute(
+            "SELECT item_keys FROM inbox_watermarks WHERE account = ?", (self._account(email),)
+        ).fetchone()
+        return json.loads(row["item_keys"]) if row else []
+
+    def advance(self, email: str, scanned_keys: List[str]):
+        """Move the watermark up to the items a scan walked
+
+        A scan that stopped early ends at a known key, so the older keys
+        below it are kept to fill the watermark up to its configured size.
+        """
+        if not scanned_keys:
+            return
+        known = self.known_keys(email)
+        boundary = scanned_keys[-1]
+        older = known[known.index(boundary) + 1:] if boundary in known else []
+        keys = list(dict.fromkeys(scanned_keys + older))[:settings.inbox_watermark_size]
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO inbox_watermarks (account, item_keys, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(account) DO UPDATE SET "
+                "item_keys = excluded.item_keys, updated_at = excluded.updated_at",
+                (self._account(email), json.dumps(keys), datetime.now().isoformat())
+            )
+
+    def clear(self, email: Optional[str] = None):
+        """Forget the watermark of one account, or of every account"""
+        with self._connection() as conn:
+            if email is None:
+                conn.execute("DELETE FROM inbox_watermarks")
+            else:
+                conn.execute("DELETE FROM inbox_watermarks WHERE account = ?", (self._account(email),))
+
+
+class RunCheckpoint(SQLiteStore):
+    """Per-account conversations a run has picked up but not finished yet
+
+    A run adds each conversation before working on it and removes it once
+    its reply is sent or its retries are used up, so whatever is left
+    belongs to a run whose browser died. The next attempt starts with those.
+    """
+
+    schema = RUN_CHECKPOINTS_SCHEMA
+
+    @staticmethod
+    def _account(email: str) -> str:
+        return email.strip().lower()
+
+    def add(self, email: str, messages: List[ZillowMessage]):
+        """Record conversations the run is about to work on"""
+        now = datetime.now().isoformat()
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO run_checkpoints (account, message_id, message, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(self._account(email), message.id, message.model_dump_json(), now) for message in messages]
+            )
+
+    def finish(self, email: str, message_id: str):
+        """Take a conversation off the checkpoint once it needs no more work"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM run_checkpoints WHERE account = ? AND message_id = ?",
+                         (self._account(email), message_id))
+
+    def pending(self, email: str) -> List[ZillowMessage]:
+        """Get the account's unfinished conversations in the order they were picked up
+
+        Entries older than run_checkpoint_max_age are dropped, the inbox has
+        moved on since and the next scan finds whatever is still unread.
+        """
+        cutoff = (datetime.now() - timedelta(seconds=settings.run_checkpoint_max_age)).isoformat()
+        with self._connection() as conn:
+            conn.execute("DELETE FROM run_checkpoints WHERE created_at < ?", (cutoff,))
+            rows = conn.execute(
+                "SELECT message FROM run_checkpoints WHERE account = ? ORDER BY rowid",
+                (self._account(email),)
+            ).fetchall()
+        return [ZillowMessage.model_validate_json(row["message"]) for row in rows]
+
+    def clear(self, email: Optional[str] = None):
+        """Forget the checkpoint of one account, or of every account"""
+        with self._connection() as conn:
+            if email is None:
+                conn.execute("DELETE FROM run_checkpoints")
+            else:
+                conn.execute("DELETE FROM run_checkpoints WHERE account = ?", (self._account(email),))
+
+
+class LaunchedDriverIndex(SQLiteStore):
+    """Chrome and chromedriver processes this service launched, and the process that launched each
+
+    Processes are identified by pid and start time, so a reused pid is never
+    mistaken for one of ours. Rows outlive their owner, which is how a later
+    sweep finds the browsers of a worker that crashed or was killed.
+    """
+
+    schema = LAUNCHED_DRIVERS_SCHEMA
+
+    def add(self, processes: List[Tuple[int, float]], owner: Tuple[int, float]):
+        """Record launched (pid, create_time) processes and their owning process"""
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO launched_drivers (pid, create_time, owner_pid, owner_create_time) "
+                "VALUES (?, ?, ?, ?)",
+                [(pid, create_time, *owner) for pid, create_time in processes]
+            )
+
+    def all(self) -> List[sqlite3.Row]:
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT pid, create_time, owner_pid, owner_create_time FROM launched_drivers"
+            ).fetchall()
+
+    def remove(self, pid: int, create_time: float):
+        """Forget a process that has exited"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM launched_drivers WHERE pid = ? AND create_time = ?", (pid, create_time))
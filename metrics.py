@@ -0,0 +1,132 @@
+import functools
+import inspect
+import os
+import shutil
+import time
+from typing import Callable, List, Tuple
+from config import settings
+
+# Account workers run in their own processes. prometheus_client then keeps
+# every process's samples in files under PROMETHEUS_MULTIPROC_DIR, which
+# must be set, and emptied by the parent, before prometheus_client loads.
+# Spawned workers inherit the variable and leave the files alone.
+if settings.zillow_accounts and settings.metrics_multiprocess_dir and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    shutil.rmtree(settings.metrics_multiprocess_dir, ignore_errors=True)
+    os.makedirs(settings.metrics_multiprocess_dir, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.abspath(settings.metrics_multiprocess_dir)
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Browser work ranges from milliseconds (a script call) to a minute (a cold
+# login), so the buckets span both ends
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_LATENCY = Histogram(
+    "zillow_scraper_stage_seconds",
+    "Time spent in each scraper stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+MESSAGES_CLASSIFIED = Counter(
+    "zillow_messages_classified_total",
+    "Messages classified for processing, by message type",
+    ["message_type"],
+)
+REPLIES_SENT = Counter("zillow_replies_sent_total", "Replies sent and confirmed")
+REPLIES_FAILED = Counter("zillow_replies_failed_total", "Replies that could not be sent")
+MESSAGE_RETRIES = Counter("zillow_message_retries_total", "Retried attempts at answering a message")
+LOGIN_FAILURES = Counter("zillow_login_failures_total", "Form logins that did not reach the inbox")
+NAVIGATION_BYTES = Histogram(
+    "zillow_navigation_transfer_bytes",
+    "Bytes transferred by a page load, as reported by the Resource Timing API",
+    ["page"],
+    buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 25e6),
+)
+NAVIGATION_INTERACTIVE = Histogram(
+    "zillow_navigation_interactive_seconds",
+    "Time from navigation start until the document became interactive",
+    ["page"],
+    buckets=STAGE_BUCKETS,
+)
+# Gauges sum over the live processes when workers report them too
+BROWSERS_LIVE = Gauge("zillow_browsers_live", "Browsers currently running", multiprocess_mode="livesum")
+BROWSER_RSS = Gauge("zillow_browser_rss_bytes", "Resident memory of all tracked browser process trees",
+                    multiprocess_mode="livesum")
+DRIVERS_RECYCLED = Counter("zillow_drivers_recycled_total", "Browsers replaced after reaching a limit", ["reason"])
+ORPHANS_REAPED = Counter("zillow_orphan_browsers_reaped_total", "Orphaned browser process trees terminated")
+QUEUE_DEPTH = Gauge("zillow_job_queue_depth", "Processing jobs queued or running", multiprocess_mode="livesum")
+
+# Gauges read from a function, see gauge_function
+_gauge_functions: List[Tuple[Gauge, Callable[[], float]]] = []
+
+
+def gauge_function(gauge: Gauge, func: Callable[[], float]):
+    """Set the gauge to func() whenever metrics are refreshed
+
+    Used instead of Gauge.set_function, whose values the multiprocess
+    collector never sees.
+    """
+    _gauge_functions.append((gauge, func))
+
+
+def refresh_gauges():
+    """Store the current value of every function-backed gauge"""
+    for gauge, func in _gauge_functions:
+        gauge.set(func())
+
+
+def render_metrics() -> bytes:
+    """Every metric in the Prometheus text format, worker processes included"""
+    refresh_gauges()
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead():
+    """Drop this process's live gauge values, for worker processes on exit"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def observe_stage(stage: str) -> Callable:
+    """Record a method's duration in the stage histogram
+
+    For generators only the time spent producing items counts, not the time
+    the consumer holds on to each one.
+    """
+    histogram = STAGE_LATENCY.labels(stage)
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                elapsed = 0.0
+                generator = func(*args, **kwargs)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = next(generator)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - start
+                        yield item
+                finally:
+                    generator.close()
+                    histogram.observe(elapsed)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time():
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
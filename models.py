@@ -26,6 +26,8 @@ class ZillowMessage(BaseModel):
     status: MessageStatus = MessageStatus.UNREAD
     timestamp: datetime
     conversation_url: str
+    conversation_id: Optional[str] = None
+    message_digest: Optional[str] = None
     property_address: Optional[str] = None
 
 
@@ -33,13 +35,45 @@ class MessageResponse(BaseModel):
     success: bool
     message: str
     processed_count: int = 0
+    replies_sent: int = 0
     errors: List[str] = []
 
 
 class ProcessedMessage(BaseModel):
     message_id: str
+    conversation_id: Optional[str] = None
     prospect_name: str
-    message_type: MessageType
+    message_type: Optional[MessageType] = None  # None when the message could not be classified
     response_sent: bool
     timestamp: datetime
     error_message: Optional[str] = None
+    already_replied: bool = False  # nothing sent, the conversation already had our reply
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ProcessingJob(BaseModel):
+    job_id: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    total_messages: Optional[int] = None
+    processed_messages: int = 0
+    result: Optional[MessageResponse] = None
+    error_message: Optional[str] = None
+
+
+class SchedulerStatus(BaseModel):
+    running: bool
+    interval_seconds: float
+    cycles: int = 0
+    last_run_at: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
+    last_job: Optional[ProcessingJob] = None
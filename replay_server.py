@@ -0,0 +1,361 @@
+"""Local stand-in for the Zillow rental-manager inbox.
+
+Serves login, inbox and conversation pages built from a fixture corpus
+using the same data-testid markup the scraper relies on, and records
+every reply that is sent. The inbox JSON API listed by the HTTP inbox
+backend is served too. Point the scraper at it with
+ZILLOW_BASE_URL=http://127.0.0.1:8765, then run:
+
+    python replay_server.py --conversations 10000 --latency 0.05
+    python replay_server.py --corpus fixtures/inbox_sample.json
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+SESSION_COOKIE = "zrm_replay_session"
+
+# Matches the default settings.inbox_api_path
+INBOX_API_PATH = "/rental-manager/api/inbox/conversations"
+
+PROSPECT_NAMES = [
+    "John Doe", "Maria Garcia", "Aisha Khan", "Wei Chen", "Carlos Ruiz",
+    "Fatima Ali", "Liam Murphy", "Priya Patel", "Noah Kim", "Sofia Rossi",
+]
+
+STREETS = [
+    "Blue Hill Ave", "Washington St", "Columbia Rd", "Dudley St",
+    "Warren St", "Talbot Ave", "Geneva Ave", "Norfolk St",
+]
+
+STATUSES = ["TOUR REQUESTED", "APPLICATION REQUESTED", "INQUIRY"]
+
+INQUIRIES = [
+    "Hi, I'd like to schedule a tour of the apartment this weekend.",
+    "How do I apply for this apartment?",
+    "Do you accept Section 8 vouchers?",
+    "I have a Homebase voucher and RAFT assistance, is that ok?",
+    "I have a small dog, are pets allowed?",
+    "Is this apartment still available?",
+    "How much is the rent and when is it available?",
+]
+
+
+def build_corpus(count: int, unread_ratio: float = 0.3, seed: int = 1234) -> List[Dict[str, Any]]:
+    """Generate a reproducible inbox of conversations, newest first"""
+    rng = random.Random(seed)
+    conversations = []
+    for index in range(count):
+        unread = rng.random() < unread_ratio
+        prospect_name = rng.choice(PROSPECT_NAMES)
+        messages = [{"sender": "prospect", "text": rng.choice(INQUIRIES)}]
+        if not unread:
+            messages.append({"sender": "you", "text": "Thanks for reaching out, please apply on our website."})
+        conversations.append({
+            "id": f"{10_000_000 + count - index}",
+            "prospect_name": prospect_name,
+            "property_address": f"{rng.randint(1, 999)} {rng.choice(STREETS)} #{rng.randint(1, 12)}",
+            "status": rng.choice(STATUSES),
+            "unread": unread,
+            "messages": messages,
+        })
+    return conversations
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Load a recorded corpus from a JSON file"""
+    with open(path) as f:
+        return json.load(f)
+
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Sign in</title></head><body>
+<form method="post" action="/user/acct/login">
+  <input id="reg-login-email" name="email" type="email">
+  <input id="inputs-password" name="password" type="password">
+  <input type="submit" value="Sign in">
+</form>
+</body></html>"""
+
+INBOX_SCRIPT = """
+document.querySelectorAll('[data-testid="conversation-item"]').forEach(item => {
+  item.addEventListener('click', () => {
+    window.location.href = '/rental-manager/inbox/' + item.id + '/';
+  });
+});
+const send = document.querySelector('button.send-message-button');
+if (send) {
+  send.addEventListener('click', async () => {
+    const input = document.querySelector('[aria-label="Message input;"]');
+    const text = input.value;
+    await fetch('/api/conversations/' + send.dataset.conversation + '/replies', {
+      method: 'POST', headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify({text: text})
+    });
+    const li = document.createElement('li');
+    li.setAttribute('data-testid', 'message-item');
+    li.setAttribute('aria-label', 'You sent');
+    li.innerHTML = '<div data-testid="chat-bubble"><p></p></div>';
+    li.querySelector('p').textContent = text;
+    document.querySelector('[data-testid="message-thread"]').appendChild(li);
+    input.value = '';
+  });
+}
+"""
+
+
+class ReplayInbox:
+    """Mutable inbox state shared by the request handlers"""
+
+    def __init__(self, conversations: List[Dict[str, Any]], latency: float = 0.0):
+        self.conversations = conversations
+        self.by_id = {c["id"]: c for c in conversations}
+        self.latency = latency
+        self.sent_replies: List[Dict[str, Any]] = []
+        self.sessions = set()
+        self.lock = threading.Lock()
+
+    def record_reply(self, conversation_id: str, text: str) -> bool:
+        with self.lock:
+            conversation = self.by_id.get(conversation_id)
+            if conversation is None:
+                return False
+            conversation["messages"].append({"sender": "you", "text": text})
+            conversation["unread"] = False
+            self.sent_replies.append({
+                "conversation_id": conversation_id,
+                "text": text,
+                "sent_at": datetime.now().isoformat(),
+            })
+            return True
+
+    def render_inbox(self, open_id: Optional[str]) -> str:
+        """Render the conversation list and, optionally, one open conversation"""
+        with self.lock:
+            items = "".join(self._render_item(c) for c in self.conversations)
+            thread = self._render_thread(self.by_id.get(open_id)) if open_id else ""
+        return (
+            "<!DOCTYPE html><html><head><title>Inbox</title></head><body>"
+            '<div class="inbox"><ul data-testid="message-list">' + items + "</ul>"
+            + thread + "</div><script>" + INBOX_SCRIPT + "</script></body></html>"
+        )
+
+    def conversation_records(self, unread_only: bool) -> List[Dict[str, Any]]:
+        """Conversation list in the shape returned by the inbox JSON API"""
+        with self.lock:
+            return [
+                {
+                    "id": c["id"],
+                    "prospect_name": c["prospect_name"],
+                    "property_address": c["property_address"],
+                    "status": c["status"],
+                    "unread": c["unread"],
+                    "last_message": c["messages"][-1]["text"],
+                    "last_message_from_you": c["messages"][-1]["sender"] == "you",
+                }
+                for c in self.conversations
+                if c["unread"] or not unread_only
+            ]
+
+    @staticmethod
+    def _render_item(conversation: Dict[str, Any]) -> str:
+        last = conversation["messages"][-1]
+        preview = last["text"] if last["sender"] == "prospect" else f"You: {last['text']}"
+        badge = '<span data-testid="unread-badge">1</span>' if conversation["unread"] else ""
+        return (
+            f'<li data-testid="conversation-item" id="{html.escape(conversation["id"])}">'
+            f'<span data-testid="participant-name">{html.escape(conversation["prospect_name"])}</span>'
+            f'<div data-testid="status-label"><span>{html.escape(conversation["status"])}</span></div>'
+            f'<div data-testid="message-preview"><p data-c11n-component="Paragraph">{html.escape(preview)}</p></div>'
+            f'<span data-testid="address">{html.escape(conversation["property_address"])}</span>'
+            f"{badge}</li>"
+        )
+
+    @staticmethod
+    def _render_thread(conversation: Optional[Dict[str, Any]]) -> str:
+        if conversation is None:
+            return ""
+        messages = "".join(
+            f'<li data-testid="message-item" aria-label="{"You sent" if m["sender"] == "you" else "Prospect sent"}">'
+            f'<div data-testid="chat-bubble"><p>{html.escape(m["text"])}</p></div></li>'
+            for m in conversation["messages"]
+        )
+        return (
+            f'<section class="conversation"><ul data-testid="message-thread">{messages}</ul>'
+            '<textarea aria-label="Message input;"></textarea>'
+            f'<button class="send-message-button" data-conversation="{html.escape(conversation["id"])}">Send</button>'
+            "</section>"
+        )
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    """Serves the replay inbox"""
+
+    inbox: ReplayInbox
+
+    def log_message(self, format, *args):
+        pass
+
+    def _has_session(self) -> bool:
+        cookies = self.headers.get("Cookie", "")
+        return any(
+            part.strip().split("=", 1) == [SESSION_COOKIE, token]
+            for part in cookies.split(";") for token in self.inbox.sessions
+        )
+
+    def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8",
+              headers: Optional[Dict[str, str]] = None):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+        self._send(302, "", headers={"Location": location, **(headers or {})})
+
+    def _json(self, data: Any, status: int = 200):
+        self._send(status, json.dumps(data), "application/json")
+
+    def do_GET(self):
+        if self.inbox.latency:
+            time.sleep(self.inbox.latency)
+        url = urlparse(self.path)
+        path = url.path
+
+        if path == "/robots.txt":
+            return self._send(200, "User-agent: *\n", "text/plain")
+        if path == "/user/acct/login":
+            return self._send(200, LOGIN_PAGE)
+        if path == "/api/replies":
+            with self.inbox.lock:
+                return self._json(list(self.inbox.sent_replies))
+        if path == INBOX_API_PATH:
+            if not self._has_session():
+                return self._json({"error": "unauthorized"}, 401)
+            unread_only = parse_qs(url.query).get("unread_only") == ["true"]
+            return self._json({"conversations": self.inbox.conversation_records(unread_only)})
+        if path.startswith("/rental-manager/inbox"):
+            if not self._has_session():
+                return self._redirect("/user/acct/login?url=%2Frental-manager%2Finbox")
+            parts = [p for p in path.split("/") if p]
+            open_id = parts[2] if len(parts) > 2 else None
+            return self._send(200, self.inbox.render_inbox(open_id))
+        self._send(404, "Not found", "text/plain")
+
+    def do_POST(self):
+        if self.inbox.latency:
+            time.sleep(self.inbox.latency)
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+
+        if path == "/user/acct/login":
+            form = parse_qs(body)
+            if not form.get("email") or not form.get("password"):
+                return self._send(200, LOGIN_PAGE)
+            token = uuid.uuid4().hex
+            self.inbox.sessions.add(token)
+            return self._redirect("/rental-manager/inbox/?ap=x", {
+                "Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/",
+            })
+
+        parts = [p for p in path.split("/") if p]
+        if len(parts) == 4 and parts[:2] == ["api", "conversations"] and parts[3] == "replies":
+            if not self._has_session():
+                return self._json({"error": "unauthorized"}, 401)
+            try:
+                text = json.loads(body or "{}").get("text", "")
+            except ValueError:
+                return self._json({"error": "invalid body"}, 400)
+            if not self.inbox.record_reply(parts[2], text):
+                return self._json({"error": "unknown conversation"}, 404)
+            return self._json({"success": True})
+
+        self._send(404, "Not found", "text/plain")
+
+
+class ReplayServer:
+    """Runs the replay inbox on a background thread"""
+
+    def __init__(self, conversations: List[Dict[str, Any]], host: str = "127.0.0.1",
+                 port: int = 0, latency: float = 0.0):
+        self.inbox = ReplayInbox(conversations, latency)
+        handler = type("BoundReplayRequestHandler", (ReplayRequestHandler,), {"inbox": self.inbox})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sent_replies(self) -> List[Dict[str, Any]]:
+        with self.inbox.lock:
+            return list(self.inbox.sent_replies)
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local replay of the Zillow inbox")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--unread-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--corpus", help="recorded corpus JSON to serve instead of a generated one")
+    parser.add_argument("--dump-corpus", help="write the corpus being served to this file")
+    args = parser.parse_args()
+
+    corpus = (load_corpus(args.corpus) if args.corpus
+              else build_corpus(args.conversations, args.unread_ratio, args.seed))
+    if args.dump_corpus:
+        with open(args.dump_corpus, "w") as f:
+            json.dump(corpus, f, indent=2)
+
+    server = ReplayServer(corpus, args.host, args.port, args.latency)
+    print(f"Replaying {len(corpus)} conversations at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"{len(server.sent_replies)} replies recorded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from loguru import logger
+from models import JobStatus, MessageResponse, ProcessingJob, SchedulerStatus
+from job_queue import JobContext, JobQueue
+from config import settings
+
+
+class PollingScheduler:
+    """Runs processing jobs on an adaptive interval
+
+    Every run goes through the job queue, so scheduled runs show up under
+    /jobs and never overlap manual ones. The interval starts at
+    check_interval, drops to scheduler_min_interval after a run that sent
+    replies and grows by scheduler_backoff after idle or failed runs, up to
+    scheduler_max_interval.
+    """
+
+    def __init__(self, queue: JobQueue, job: Callable[[JobContext], MessageResponse]):
+        self.queue = queue
+        self.job = job
+        self.interval = float(settings.check_interval)
+        self.cycles = 0
+        self.last_run_at: Optional[datetime] = None
+        self.next_run_at: Optional[datetime] = None
+        self.last_job: Optional[ProcessingJob] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return (self._thread is not None and self._thread.is_alive()
+                and not self._stop.is_set())
+
+    def start(self) -> bool:
+        """Start polling, running the first cycle right away"""
+        with self._lock:
+            if self.running:
+                return False
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._loop, args=(self._stop,),
+                                            name="polling-scheduler", daemon=True)
+            self._thread.start()
+        logger.info("Polling scheduler started")
+        return True
+
+    def stop(self) -> bool:
+        """Stop polling; a run already in progress finishes as a normal job"""
+        with self._lock:
+            if not self.running:
+                return False
+            self._stop.set()
+            self.next_run_at = None
+        logger.info("Polling scheduler stopped")
+        return True
+
+    def _loop(self, stop: threading.Event):
+        while not stop.is_set():
+            self.last_run_at = datetime.now()
+            job = self.queue.submit(self.job)
+            finished = None
+            while finished is None and not stop.is_set():
+                finished = self.queue.wait(job.job_id, timeout=1)
+            if finished is None:
+                return
+
+            self.cycles += 1
+            self.last_job = finished
+            self._adapt(finished)
+            self.next_run_at = datetime.now() + timedelta(seconds=self.interval)
+            logger.info(f"Next scheduled run in {self.interval:.0f}s")
+            stop.wait(self.interval)
+
+    def _adapt(self, job: ProcessingJob):
+        """Poll sooner while prospects are active, back off while the inbox is quiet
+
+        Only replies actually sent count as activity, an account whose sends
+        keep failing is backed off like a quiet one.
+        """
+        result = job.result
+        if job.status == JobStatus.COMPLETED and result and result.replies_sent:
+            self.interval = float(settings.scheduler_min_interval)
+        else:
+            self.interval = min(max(self.interval, settings.scheduler_min_interval) * settings.scheduler_backoff,
+                                float(settings.scheduler_max_interval))
+
+    def status(self) -> SchedulerStatus:
+        """Get the scheduler state and the outcome of its last run"""
+        return SchedulerStatus(
+            running=self.running,
+            interval_seconds=self.interval,
+            cycles=self.cycles,
+            last_run_at=self.last_run_at,
+            next_run_at=self.next_run_at if self.running else None,
+            last_job=self.last_job,
+        )
@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from loguru import logger
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows, saves stay atomic but are not serialised between processes
+    fcntl = None
+
+# Index of the first candidate selector present in the page, -1 if none is
+FIRST_MATCH_SCRIPT = """
+const selectors = arguments[0];
+return selectors.findIndex(selector => document.querySelector(selector) !== null);
+"""
+
+# Per page type fields that only the process promoting a new winner writes
+WINNER_FIELDS = ("winner", "challenger", "challenger_streak")
+
+
+def _last_seen(page: Dict[str, Any]) -> float:
+    return max(page.get("last_hit_at") or 0, page.get("last_miss_at") or 0)
+
+
+def _latest(first: Optional[float], second: Optional[float]) -> Optional[float]:
+    return max((t for t in (first, second) if t is not None), default=None)
+
+
+class SelectorRegistry:
+    """Remembers which candidate selector matched per page type, persisted as JSON
+
+    Account worker processes share the file. Each save merges this
+    process's counts since its last save into the file under a lock; the
+    winner is only overwritten by the process that promoted a new one.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.selector_registry_path
+        self._lock = threading.Lock()
+        self._pages: Dict[str, Dict[str, Any]] = self._load()
+        # Not written yet, {page_type: {"selectors": {...}, "misses": n, "promoted": bool}}
+        self._unsaved: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable selector registry {self.path}: {e}")
+            return {}
+
+    def _save(self, force: bool = False):
+        # Called with the lock held; routine hits are written at most every selector_save_interval
+        self._dirty = True
+        if not force and time.monotonic() - self._saved_at < settings.selector_save_interval:
+            return
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with self._file_lock():
+                pages = self._merge(self._load())
+                with open(tmp_path, "w") as f:
+                    json.dump(pages, f, indent=2)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            # The unsaved counts are kept for the next attempt
+            logger.warning(f"Failed to save selector registry: {e}")
+            return
+        self._pages = pages
+        self._unsaved = {}
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the registry file's lock across the read, merge and replace"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _merge(self, stored: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Add the unsaved counts to the stored pages
+
+        The miss streak comes from whichever side saw the page last, the
+        winner from this process only if it promoted one since its last save.
+        """
+        for page_type, page in self._pages.items():
+            stored_page = stored.get(page_type)
+            if stored_page is None:
+                stored[page_type] = json.loads(json.dumps(page))
+                continue
+            unsaved = self._unsaved.get(page_type)
+            if unsaved is None:
+                continue
+            for selector, hits in unsaved["selectors"].items():
+                stored_page["selectors"][selector] = stored_page["selectors"].get(selector, 0) + hits
+            stored_page["misses"] = stored_page.get("misses", 0) + unsaved["misses"]
+            if unsaved["promoted"] or stored_page.get("winner") is None:
+                for field in WINNER_FIELDS:
+                    stored_page[field] = page.get(field)
+            if _last_seen(page) >= _last_seen(stored_page):
+                stored_page["consecutive_misses"] = page["consecutive_misses"]
+            stored_page["last_hit_at"] = _latest(page["last_hit_at"], stored_page.get("last_hit_at"))
+            stored_page["last_miss_at"] = _latest(page["last_miss_at"], stored_page.get("last_miss_at"))
+        return stored
+
+    def _unsaved_counts(self, page_type: str) -> Dict[str, Any]:
+        return self._unsaved.setdefault(page_type, {"selectors": {}, "misses": 0, "promoted": False})
+
+    def _page(self, page_type: str) -> Dict[str, Any]:
+        return self._pages.setdefault(page_type, {
+            "winner": None,
+            "challenger": None,
+            "challenger_streak": 0,
+            "selectors": {},
+            "misses": 0,
+            "consecutive_misses": 0,
+            "last_hit_at": None,
+            "last_miss_at": None,
+        })
+
+    def candidates(self, page_type: str, selectors: List[str]) -> List[str]:
+        """Order candidates with the last winner first, then by past hits"""
+        with self._lock:
+            page = self._pages.get(page_type)
+            if not page:
+                return list(selectors)
+            hits = {selector: page["selectors"].get(selector, 0) for selector in selectors}
+            winner = page["winner"]
+        # sorted() is stable, so ties keep the caller's order
+        return sorted(selectors, key=lambda s: (s != winner, -hits[s]))
+
+    def timeout(self, page_type: str, default: float) -> float:
+        """Shorten the wait when nothing has matched this page type recently"""
+        with self._lock:
+            page = self._pages.get(page_type)
+            if not page or page["consecutive_misses"] < settings.selector_demote_after:
+                return default
+            recent = time.time() - page["last_miss_at"] < settings.selector_fail_fast_window
+        if recent:
+            return min(default, settings.selector_fail_fast_timeout)
+        return default
+
+    def record_hit(self, page_type: str, selector: str):
+        """Count a match; another selector only takes over as winner after matching several times in a row"""
+        with self._lock:
+            page = self._page(page_type)
+            page["selectors"][selector] = page["selectors"].get(selector, 0) + 1
+            unsaved = self._unsaved_counts(page_type)["selectors"]
+            unsaved[selector] = unsaved.get(selector, 0) + 1
+            page["consecutive_misses"] = 0
+            page["last_hit_at"] = time.time()
+            promoted = False
+            if page["winner"] is None or selector == page["winner"]:
+                promoted = page["winner"] is None
+                page["winner"] = selector
+                page["challenger"], page["challenger_streak"] = None, 0
+            else:
+                streak = page.get("challenger_streak", 0) + 1 if page.get("challenger") == selector else 1
+                page["challenger"], page["challenger_streak"] = selector, streak
+                if streak >= settings.selector_demote_after:
+                    logger.info(f"{selector} replaces {page['winner']} as the {page_type} selector")
+                    page["winner"] = selector
+                    page["challenger"], page["challenger_streak"] = None, 0
+                    promoted = True
+            if promoted:
+                self._unsaved_counts(page_type)["promoted"] = True
+            self._save(force=promoted)
+
+    def record_miss(self, page_type: str):
+        """Record that no candidate matched within the timeout"""
+        with self._lock:
+            page = self._page(page_type)
+            page["misses"] += 1
+            self._unsaved_counts(page_type)["misses"] += 1
+            page["consecutive_misses"] += 1
+            page["last_miss_at"] = time.time()
+            self._save()
+        logger.warning(f"No selector matched for {page_type}")
+
+    def flush(self):
+        """Write counters still held back by the save interval"""
+        with self._lock:
+            if self._dirty:
+                self._save(force=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the winning selector and hit/miss counters per page type"""
+        with self._lock:
+            return json.loads(json.dumps(self._pages))
+
+
+selector_registry = SelectorRegistry()
+atexit.register(selector_registry.flush)
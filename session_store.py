@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from config import settings
+
+
+class SessionStore:
+    """On-disk store of browser cookies and local storage keyed by account"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.session_store_dir
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "saves": 0}
+
+    def _account_key(self, email: str) -> str:
+        return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, email: str) -> str:
+        return os.path.join(self.directory, f"{self._account_key(email)}.json")
+
+    def save(self, email: str, cookies: List[Dict[str, Any]],
+             local_storage: Dict[str, str]):
+        """Persist the session of a freshly logged-in account"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(email)
+        tmp_path = f"{path}.tmp"
+        payload = {
+            "saved_at": time.time(),
+            "cookies": cookies,
+            "local_storage": local_storage,
+        }
+
+        # Write atomically and keep the file private, it holds auth cookies
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._stats["saves"] += 1
+        logger.info(f"Saved browser session for {email}")
+
+    def load(self, email: str) -> Optional[Dict[str, Any]]:
+        """Load a stored session, or None if there is nothing usable on disk"""
+        try:
+            with open(self._path(email)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable session file for {email}: {e}")
+            return None
+
+    def delete(self, email: str):
+        """Forget the stored session for an account"""
+        try:
+            os.remove(self._path(email))
+        except FileNotFoundError:
+            pass
+
+    def session_age(self, email: str) -> Optional[float]:
+        """Seconds since the account's session was saved"""
+        session = self.load(email)
+        if not session:
+            return None
+        return time.time() - session.get("saved_at", 0)
+
+    def record_hit(self):
+        with self._lock:
+            self._stats["hits"] += 1
+
+    def record_miss(self):
+        with self._lock:
+            self._stats["misses"] += 1
+
+    def stats(self, email: Optional[str] = None) -> Dict[str, Any]:
+        """Get restore hit/miss counters and, optionally, one account's session age"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        if email:
+            stats["session_age_seconds"] = self.session_age(email)
+        return stats
+
+
+session_store = SessionStore()
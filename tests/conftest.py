@@ -0,0 +1,14 @@
+import pytest
+
+from selector_registry import selector_registry
+from tracing import trace_recorder
+
+
+@pytest.fixture(autouse=True)
+def isolated_files(tmp_path, monkeypatch):
+    """Write the selector stats and traces of a test to its temporary directory"""
+    monkeypatch.setattr(selector_registry, "path", str(tmp_path / "selector_stats.json"))
+    monkeypatch.setattr(trace_recorder, "directory", str(tmp_path / "traces"))
+    yield
+    # Counters held back by the save interval would otherwise be written on exit
+    selector_registry.flush()
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
+from typing import List
+
+import psutil
+import pytest
+
+from config import settings
+from driver_lifecycle import DriverLifecycle
+from message_store import LaunchedDriverIndex
+
+
+@pytest.fixture
+def spawn():
+    """Start stand-in browser processes, killed after the test"""
+    processes: List[subprocess.Popen] = []
+
+    def start() -> psutil.Process:
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        processes.append(process)
+        return psutil.Process(process.pid)
+
+    yield start
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+@pytest.fixture
+def lifecycle(tmp_path, monkeypatch) -> DriverLifecycle:
+    monkeypatch.setattr(settings, "driver_orphan_min_age", 0)
+    return DriverLifecycle(LaunchedDriverIndex(str(tmp_path / "messages.db")))
+
+
+def identity(process: psutil.Process):
+    return process.pid, process.create_time()
+
+
+def exited_process():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    owner = identity(psutil.Process(process.pid))
+    process.wait()
+    return owner
+
+
+def test_reaps_only_launches_whose_owner_is_gone(lifecycle, spawn):
+    abandoned, kept, foreign, worker = spawn(), spawn(), spawn(), spawn()
+    lifecycle.launches.add([identity(abandoned)], exited_process())
+    lifecycle.launches.add([identity(kept)], identity(worker))
+
+    assert [process.pid for process in lifecycle.find_orphans()] == [abandoned.pid]
+    assert lifecycle.reap_orphans() == 1
+
+    assert not abandoned.is_running()
+    # Owned by a live worker, or never launched by us at all
+    assert kept.is_running()
+    assert foreign.is_running()
+
+
+def test_own_launch_is_an_orphan_once_untracked(lifecycle, spawn):
+    browser = spawn()
+    scraper = SimpleNamespace(driver=SimpleNamespace(browser_pid=browser.pid))
+    lifecycle.register(scraper)
+    assert lifecycle.find_orphans() == []
+
+    # Unregistered, but its quit never went through
+    lifecycle.unregister(scraper)
+    assert [process.pid for process in lifecycle.find_orphans()] == [browser.pid]
+
+
+def test_forgets_launches_that_exited(lifecycle):
+    lifecycle.launches.add([exited_process()], identity(psutil.Process(os.getpid())))
+
+    assert lifecycle.find_orphans() == []
+    assert lifecycle.launches.all() == []
+
+
+def test_start_reaps_on_a_background_thread(lifecycle, monkeypatch):
+    monkeypatch.setattr(settings, "driver_reap_interval", 0)
+    release, reaped = threading.Event(), threading.Event()
+
+    def slow_reap():
+        release.wait(5)
+        reaped.set()
+
+    monkeypatch.setattr(lifecycle, "reap_orphans", slow_reap)
+    lifecycle.start()
+    assert not reaped.is_set()
+
+    release.set()
+    assert reaped.wait(5)
+    lifecycle.stop()
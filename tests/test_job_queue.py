@@ -0,0 +1,55 @@
+import threading
+
+from job_queue import JobQueue
+from models import JobStatus, MessageResponse
+
+
+def test_cancelling_a_queued_job_never_runs_it():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    ran = []
+
+    def blocking(context):
+        release.wait(10)
+        return MessageResponse(success=True, message="done")
+
+    running = queue.submit(blocking)
+    queued = queue.submit(lambda context: ran.append(context.job_id))
+    try:
+        assert queue.queue_depth() == 2
+        assert queue.cancel(queued.job_id)
+        assert queue.get(queued.job_id).status == JobStatus.CANCELLED
+    finally:
+        release.set()
+    assert queue.wait(running.job_id, timeout=10).status == JobStatus.COMPLETED
+
+    assert ran == []
+    events, finished = queue.events(queued.job_id)
+    assert finished
+    assert [event["data"]["status"] for event in events] == ["queued", "cancelled"]
+    assert not queue.cancel(queued.job_id)
+    queue.shutdown()
+
+
+def test_progress_events_and_finished_history():
+    queue = JobQueue(max_workers=1, max_history=2)
+
+    def job(context):
+        context.report_progress(0, None)
+        context.report_progress(1, 1)
+        return MessageResponse(success=True, message="done", processed_count=1)
+
+    jobs = [queue.submit(job) for _ in range(3)]
+    for submitted in jobs:
+        queue.wait(submitted.job_id, timeout=10)
+    queue.submit(job)
+
+    # The oldest finished jobs and their events are dropped once the history is full
+    assert queue.get(jobs[0].job_id) is None
+    assert queue.events(jobs[1].job_id) is None
+    events, finished = queue.events(jobs[2].job_id)
+    assert finished
+    assert [event["event"] for event in events] == ["status", "status", "progress", "progress", "status"]
+    later, _ = queue.events(jobs[2].job_id, after=events[2]["id"])
+    assert later == events[3:]
+    queue.shutdown()
@@ -0,0 +1,141 @@
+import json
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from message_store import ProcessedMessageStore
+from tests.test_message_processor import ScriptedInbox, make_processor
+from tests.test_message_store import processed
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(main.app)
+
+
+def classify_batch(client: TestClient, body: bytes):
+    response = client.post("/classify-batch", content=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_classify_batch_ndjson(client):
+    body = (
+        b'{"message_content": "Can I schedule a tour?", "prospect_name": "Ana"}\n'
+        b'\n'
+        b'{"message_content": "Do you take pets?"\n'
+        b'{"prospect_name": "Bo"}\n'
+        b'{"message_content": "Is it available?"}\n'
+    )
+    results = classify_batch(client, body)
+
+    assert [result.get("classified_type") for result in results] == [
+        "tour_requested", None, None, "general_inquiry"
+    ]
+    assert results[0]["prospect_name"] == "Ana"
+    assert results[0]["response_template"]
+    assert results[1]["line"] == 3
+    assert results[1]["error"].startswith("Invalid JSON on line 3")
+    assert results[2] == {"error": "Record must be an object with a message_content string"}
+
+
+def test_classify_batch_json_array(client):
+    body = b'[{"message_content": "How do I apply?"}, {"prospect_name": "Bo"}, {"message_content": "A dog?"}]'
+    results = classify_batch(client, body)
+
+    assert [result.get("classified_type") for result in results] == [
+        "application_requested", None, "pet_policy"
+    ]
+    assert results[1] == {"error": "Record must be an object with a message_content string"}
+
+
+def test_classify_batch_malformed_json_array(client):
+    results = classify_batch(client, b'[{"message_content": "A tour?"}, {"message_content": ]')
+
+    assert results[0]["classified_type"] == "tour_requested"
+    assert results[-1]["error"].startswith("Invalid input")
+
+
+def test_processed_messages_total_only_when_asked(client, tmp_path, monkeypatch):
+    store = ProcessedMessageStore(str(tmp_path / "messages.db"))
+    store.add_many(processed(index) for index in range(7))
+    monkeypatch.setattr(main.message_processor, "store", store)
+
+    body = client.get("/processed-messages", params={"limit": 5}).json()
+    assert len(body["processed_messages"]) == 5
+    assert body["next_cursor"] is not None
+    assert body["total_count"] is None
+
+    body = client.get("/processed-messages", params={
+        "limit": 5, "cursor": body["next_cursor"], "response_sent": True, "include_total": True
+    }).json()
+    assert [message["message_id"] for message in body["processed_messages"]] == ["zillow_1"]
+    assert body["next_cursor"] is None
+    assert body["total_count"] == 5
+
+
+def server_sent_events(text: str) -> List[Dict[str, Any]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append({"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])})
+    return events
+
+
+@pytest.fixture
+def finished_job(client, tmp_path, monkeypatch) -> Dict[str, Any]:
+    scraper = ScriptedInbox({"101": ("Ana", "Can I schedule a tour?"), "102": ("Bo", "Do you allow pets?")})
+    monkeypatch.setattr(main, "message_processor", make_processor(tmp_path, scraper))
+
+    response = client.post("/process-messages", json={})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued"
+    assert main.job_queue.wait(job["job_id"], timeout=30) is not None
+    return job
+
+
+def test_job_status_and_result(client, finished_job):
+    job = client.get(f"/jobs/{finished_job['job_id']}").json()
+
+    assert job["status"] == "completed"
+    assert job["processed_messages"] == job["total_messages"] == 2
+    assert job["result"]["replies_sent"] == 2
+    assert finished_job["job_id"] in [listed["job_id"] for listed in client.get("/jobs").json()["jobs"]]
+
+
+def test_job_events_stream(client, finished_job):
+    response = client.get(f"/jobs/{finished_job['job_id']}/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = server_sent_events(response.text)
+
+    assert [event["id"] for event in events] == sorted(event["id"] for event in events)
+    statuses = [event["data"]["status"] for event in events if event["event"] == "status"]
+    assert statuses == ["queued", "running", "completed"]
+    progress = [(event["data"]["processed"], event["data"]["total"])
+                for event in events if event["event"] == "progress"]
+    assert progress[0] == (0, None)
+    assert progress[-1] == (2, 2)
+    messages = [event["data"] for event in events if event["event"] == "message"]
+    assert [message["conversation_id"] for message in messages] == ["101", "102"]
+    assert all(message["response_sent"] for message in messages)
+
+
+def test_job_events_resume_after_last_event_id(client, finished_job):
+    url = f"/jobs/{finished_job['job_id']}/events"
+    events = server_sent_events(client.get(url).text)
+    first_message = next(event for event in events if event["event"] == "message")
+
+    resumed = server_sent_events(client.get(url, headers={"Last-Event-ID": str(first_message["id"])}).text)
+
+    assert resumed == [event for event in events if event["id"] > first_message["id"]]
+    assert [event["data"]["conversation_id"] for event in resumed if event["event"] == "message"] == ["102"]
+
+
+def test_unknown_job(client):
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get("/jobs/missing/events").status_code == 404
+    assert client.delete("/jobs/missing").status_code == 404
@@ -0,0 +1,41 @@
+import pytest
+
+from message_classifier import MessageClassifier
+from models import MessageType
+
+
+@pytest.fixture(scope="module")
+def classifier() -> MessageClassifier:
+    return MessageClassifier()
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("Do you allow a cat?", {"pet_policy"}),
+    ("Great location, nice neighborhood", set()),
+    ("Is the rent competitive for the area?", {"general_inquiry"}),
+    ("Are pets allowed?", {"pet_policy"}),
+    ("Do you have any tours this week?", {"tour_requested"}),
+    ("I have a Section   8 voucher", {"homebase_section8"}),
+    ("Could I APPLY today?", {"application_requested"}),
+    ("My dad flies aircraft", set()),
+])
+def test_matches_whole_words_and_plurals(classifier, content, expected):
+    assert classifier.matched_categories(content) == expected
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("Can I tour the place? I have a dog and a Section 8 voucher", MessageType.TOUR_REQUESTED),
+    ("How do I apply? I have a dog", MessageType.APPLICATION_REQUESTED),
+    ("Do you take Homebase? I have a cat", MessageType.HOMEBASE_SECTION8),
+    ("Is a service animal okay?", MessageType.PET_POLICY),
+    ("Is the apartment still available?", MessageType.GENERAL_INQUIRY),
+    ("Nice location", MessageType.GENERAL_INQUIRY),
+])
+def test_category_precedence(classifier, content, expected):
+    assert classifier.classify_message(content) == expected
+
+
+def test_homebase_raft_detail_needs_the_whole_word(classifier):
+    assert classifier.should_include_homebase_raft(MessageType.HOMEBASE_SECTION8, "We use RAFT funds")
+    assert not classifier.should_include_homebase_raft(MessageType.HOMEBASE_SECTION8, "I build aircraft")
+    assert not classifier.should_include_homebase_raft(MessageType.TOUR_REQUESTED, "We use RAFT funds")
@@ -0,0 +1,223 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pytest
+from prometheus_client import REGISTRY
+
+from benchmarks.fakes import FakeScraper
+from browser_pool import BrowserPool
+from config import settings
+from message_processor import MessageProcessor
+from message_store import HandledConversationIndex, InboxWatermarkIndex, ProcessedMessageStore, RunCheckpoint
+from models import ZillowMessage
+
+EMAIL = "test@example.com"
+
+
+class ScriptedInbox(FakeScraper):
+    """Fake scraper serving given conversations, {conversation_id: (prospect_name, message_content)}"""
+
+    def __init__(self, inbox: Dict[str, Tuple[str, str]]):
+        super().__init__(0)
+        self.inbox = dict(inbox)
+        self.fail_sends = False
+        # Sends that fail before the next one goes through
+        self.flaky_sends = 0
+        self.send_attempts = 0
+
+    def iter_unread_messages(self, known_keys: Optional[List[str]] = None) -> Iterator[ZillowMessage]:
+        # Like the inbox script, stop at the first item whose key the last clean scan recorded
+        self._scanned_keys, self._last_scanned_key = [], None
+        for conversation_id in self.inbox:
+            message = self.message(conversation_id)
+            key = f"{conversation_id}:{message.message_digest}"
+            self._record_scanned([key])
+            if known_keys and key in known_keys:
+                return
+            yield message
+
+    def message(self, conversation_id: str) -> ZillowMessage:
+        prospect_name, message_content = self.inbox[conversation_id]
+        return self._build_message(conversation_id, prospect_name, message_content, "1 Example St #1")
+
+    def send_reply(self, message: str) -> bool:
+        self.send_attempts += 1
+        if self.flaky_sends:
+            self.flaky_sends -= 1
+            return False
+        return not self.fail_sends and super().send_reply(message)
+
+
+def make_processor(tmp_path, scraper: FakeScraper) -> MessageProcessor:
+    db_path = str(tmp_path / "messages.db")
+    return MessageProcessor(
+        pool=BrowserPool(size=1, scraper_factory=lambda: scraper),
+        store=ProcessedMessageStore(db_path),
+        handled_index=HandledConversationIndex(db_path),
+        watermarks=InboxWatermarkIndex(db_path),
+        checkpoint=RunCheckpoint(db_path),
+    )
+
+
+def test_pipelined_run_with_empty_inbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pipelined_processing", True)
+    response = make_processor(tmp_path, FakeScraper(0)).process_unread_messages(EMAIL, "secret")
+
+    assert response.success
+    assert response.processed_count == 0
+    assert response.errors == []
+
+
+def test_pipelined_run_replies_in_each_conversation_tab(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pipelined_processing", True)
+    scraper = ScriptedInbox({
+        "101": ("Ana", "Can I schedule a tour?"),
+        "102": ("Bo", "Do you allow pets?"),
+        "103": ("Cy", "Is it available?"),
+    })
+    processor = make_processor(tmp_path, scraper)
+
+    response = processor.process_unread_messages(EMAIL, "secret")
+
+    assert response.success
+    assert response.replies_sent == 3
+    assert scraper.sent_urls == [f"{settings.zillow_base_url}/rental-manager/inbox/{conversation_id}/"
+                                 for conversation_id in ("101", "102", "103")]
+    # Every prefetched tab was closed and the driver is back on the inbox tab
+    assert scraper.driver.window_handles == ["tab-0"]
+    assert scraper.driver.current_window_handle == "tab-0"
+
+
+def test_pipelined_run_in_lean_mode_opens_tabs_blank_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pipelined_processing", True)
+    monkeypatch.setattr(settings, "lean_page_load", True)
+    scraper = ScriptedInbox({"101": ("Ana", "Can I tour?"), "102": ("Bo", "Pets?")})
+
+    response = make_processor(tmp_path, scraper).process_unread_messages(EMAIL, "secret")
+
+    assert response.replies_sent == 2
+    assert [url.rsplit("/", 2)[-2] for url in scraper.sent_urls] == ["101", "102"]
+    assert scraper.driver.window_handles == ["tab-0"]
+
+
+def test_answers_a_conversation_again_only_for_a_new_message(tmp_path, monkeypatch):
+    # Scan the whole inbox every time, so only the digests tell answered conversations apart
+    monkeypatch.setattr(settings, "incremental_inbox_scan", False)
+    scraper = ScriptedInbox({
+        "101": ("Ana", "Can I schedule a tour?"),
+        "102": ("Bo", "Do you allow pets?"),
+        "103": ("Cy", "Is it available?"),
+    })
+    processor = make_processor(tmp_path, scraper)
+
+    assert processor.process_unread_messages(EMAIL, "secret").replies_sent == 3
+
+    # Unchanged conversations are skipped before any of them is opened
+    response = processor.process_unread_messages(EMAIL, "secret")
+    assert response.processed_count == 0
+    assert len(scraper.sent_replies) == 3
+
+    # A new message in a conversation that was answered before
+    scraper.inbox["102"] = ("Bo", "How do I apply for it?")
+    response = processor.process_unread_messages(EMAIL, "secret")
+    assert response.processed_count == 1
+    assert response.replies_sent == 1
+    assert "applications are completed" in scraper.sent_replies[-1]
+
+
+def test_watermark_advances_only_after_a_clean_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "max_retries", 0)
+    scraper = ScriptedInbox({"102": ("Bo", "Do you allow pets?"), "101": ("Ana", "Can I tour?")})
+    processor = make_processor(tmp_path, scraper)
+
+    scraper.fail_sends = True
+    response = processor.process_unread_messages(EMAIL, "secret")
+    assert response.replies_sent == 0
+    assert processor.watermarks.known_keys(EMAIL) == []
+
+    scraper.fail_sends = False
+    assert processor.process_unread_messages(EMAIL, "secret").replies_sent == 2
+    known_keys = processor.watermarks.known_keys(EMAIL)
+    assert [key.split(":")[0] for key in known_keys] == ["102", "101"]
+
+    # The next scan stops at the first known item, the new conversation above it is answered
+    scraper.inbox = {"103": ("Cy", "Is it available?"), **scraper.inbox}
+    response = processor.process_unread_messages(EMAIL, "secret")
+    assert response.processed_count == 1
+    assert [key.split(":")[0] for key in processor.watermarks.known_keys(EMAIL)] == ["103", "102", "101"]
+
+
+def counter(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_outcome_metrics_count_each_message_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "max_retries", 3)
+    monkeypatch.setattr(settings, "retry_backoff", 0)
+    scraper = ScriptedInbox({"102": ("Bo", "Do you allow pets?"), "101": ("Ana", "Can I tour?")})
+    scraper.fail_sends = True
+    before = {
+        "pets": counter("zillow_messages_classified_total", message_type="pet_policy"),
+        "tours": counter("zillow_messages_classified_total", message_type="tour_requested"),
+        "sent": counter("zillow_replies_sent_total"),
+        "failed": counter("zillow_replies_failed_total"),
+        "retries": counter("zillow_message_retries_total"),
+    }
+
+    make_processor(tmp_path, scraper).process_unread_messages(EMAIL, "secret")
+
+    assert counter("zillow_messages_classified_total", message_type="pet_policy") - before["pets"] == 1
+    assert counter("zillow_messages_classified_total", message_type="tour_requested") - before["tours"] == 1
+    assert counter("zillow_replies_failed_total") - before["failed"] == 2
+    assert counter("zillow_replies_sent_total") - before["sent"] == 0
+    assert counter("zillow_message_retries_total") - before["retries"] == 6
+
+
+def conversation_ids(scraper: ScriptedInbox) -> List[str]:
+    return [url.rsplit("/", 2)[-2] for url in scraper.sent_urls]
+
+
+def test_failing_send_is_retried_then_taken_off_the_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "max_retries", 2)
+    monkeypatch.setattr(settings, "retry_backoff", 0)
+    scraper = ScriptedInbox({"101": ("Ana", "Can I tour?")})
+    scraper.fail_sends = True
+    processor = make_processor(tmp_path, scraper)
+
+    response = processor.process_unread_messages(EMAIL, "secret")
+
+    assert response.replies_sent == 0
+    assert scraper.send_attempts == 3
+    assert processor.checkpoint.pending(EMAIL) == []
+    (stored,), _ = processor.store.query()
+    assert not stored.response_sent
+
+
+def test_retry_sends_the_reply_once_the_failure_passes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "max_retries", 3)
+    monkeypatch.setattr(settings, "retry_backoff", 0)
+    scraper = ScriptedInbox({"101": ("Ana", "Can I tour?")})
+    scraper.flaky_sends = 1
+    processor = make_processor(tmp_path, scraper)
+
+    assert processor.process_unread_messages(EMAIL, "secret").replies_sent == 1
+    assert scraper.send_attempts == 2
+    assert processor.checkpoint.pending(EMAIL) == []
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_checkpoint_of_a_killed_run_is_processed_first(tmp_path, monkeypatch, pipelined):
+    monkeypatch.setattr(settings, "pipelined_processing", pipelined)
+    scraper = ScriptedInbox({
+        "103": ("Cy", "Is it available?"),
+        "102": ("Bo", "Do you allow pets?"),
+        "101": ("Ana", "Can I tour?"),
+    })
+    processor = make_processor(tmp_path, scraper)
+    # The run was killed while it worked on 101, the last conversation of the scan
+    processor.checkpoint.add(EMAIL, [scraper.message("101")])
+
+    response = processor.process_unread_messages(EMAIL, "secret")
+
+    assert response.replies_sent == 3
+    assert conversation_ids(scraper) == ["101", "103", "102"]
+    assert processor.checkpoint.pending(EMAIL) == []
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+from config import settings
+from message_store import HandledConversationIndex, InboxWatermarkIndex, ProcessedMessageStore
+from models import MessageType, ProcessedMessage
+
+START = datetime(2024, 1, 1, 9, 0)
+TYPES = [MessageType.TOUR_REQUESTED, MessageType.PET_POLICY, MessageType.GENERAL_INQUIRY]
+
+
+def processed(index: int) -> ProcessedMessage:
+    return ProcessedMessage(
+        message_id=f"zillow_{index}",
+        conversation_id=f"conversation_{index % 4}",
+        prospect_name=f"Prospect {index}",
+        message_type=TYPES[index % len(TYPES)],
+        response_sent=index % 5 != 0,
+        timestamp=START + timedelta(hours=index),
+        error_message=None if index % 5 else "Failed to send reply",
+    )
+
+
+@pytest.fixture
+def store(tmp_path) -> ProcessedMessageStore:
+    store = ProcessedMessageStore(str(tmp_path / "messages.db"))
+    store.add_many(processed(index) for index in range(25))
+    return store
+
+
+def all_pages(store: ProcessedMessageStore, limit: int, **filters) -> List[List[ProcessedMessage]]:
+    pages, cursor = [], None
+    while True:
+        page, cursor = store.query(limit=limit, cursor=cursor, **filters)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_message_newest_first(store):
+    pages = all_pages(store, limit=10)
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [message.message_id for page in pages for message in page]
+    assert ids == [f"zillow_{index}" for index in reversed(range(25))]
+
+
+def test_last_page_has_no_cursor(store):
+    page, cursor = store.query(limit=25)
+    assert len(page) == 25
+    assert cursor is None
+
+    # A full last page must not promise another one
+    pages = all_pages(store, limit=5)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 5]
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"message_type": MessageType.PET_POLICY}, [i for i in range(25) if i % 3 == 1]),
+    ({"response_sent": False}, [i for i in range(25) if i % 5 == 0]),
+    ({"response_sent": True}, [i for i in range(25) if i % 5 != 0]),
+    ({"conversation_id": "conversation_2"}, [i for i in range(25) if i % 4 == 2]),
+    ({"since": START + timedelta(hours=20)}, list(range(20, 25))),
+    ({"until": START + timedelta(hours=3)}, list(range(3))),
+    ({"message_type": MessageType.TOUR_REQUESTED, "response_sent": True,
+      "since": START + timedelta(hours=6)}, [i for i in range(6, 25) if i % 3 == 0 and i % 5 != 0]),
+])
+def test_filters_apply_across_pages(store, filters, expected):
+    pages = all_pages(store, limit=2, **filters)
+
+    ids = [message.message_id for page in pages for message in page]
+    assert ids == [f"zillow_{index}" for index in reversed(expected)]
+    assert store.count(**filters) == len(expected)
+
+
+def test_round_trips_every_field(store):
+    (message,), _ = store.query(limit=1, conversation_id="conversation_0", response_sent=False)
+
+    assert message == processed(20)
+
+
+def test_handled_conversation_keeps_the_latest_digest(tmp_path):
+    index = HandledConversationIndex(str(tmp_path / "messages.db"))
+    assert not index.is_handled("conversation_1", "digest_a")
+
+    index.mark_handled("conversation_1", "digest_a")
+    assert index.is_handled("conversation_1", "digest_a")
+    assert not index.is_handled("conversation_2", "digest_a")
+
+    # A new message in the same conversation replaces the answered one
+    index.mark_handled("conversation_1", "digest_b")
+    assert index.is_handled("conversation_1", "digest_b")
+    assert not index.is_handled("conversation_1", "digest_a")
+
+
+def test_handled_digests_looks_up_more_ids_than_one_query_takes(tmp_path):
+    index = HandledConversationIndex(str(tmp_path / "messages.db"))
+    for number in range(0, 1200, 3):
+        index.mark_handled(f"conversation_{number}", f"digest_{number}")
+
+    digests = index.handled_digests([f"conversation_{number}" for number in range(1200)])
+
+    assert digests == {f"conversation_{number}": f"digest_{number}" for number in range(0, 1200, 3)}
+
+
+def test_watermark_keeps_the_keys_below_where_a_scan_stopped(tmp_path):
+    watermarks = InboxWatermarkIndex(str(tmp_path / "messages.db"))
+    watermarks.advance("Owner@Example.com", ["c:1", "b:1", "a:1"])
+    assert watermarks.known_keys("owner@example.com") == ["c:1", "b:1", "a:1"]
+
+    # Two new items above, then the scan stopped at the first known key
+    watermarks.advance("owner@example.com", ["e:1", "c:2", "b:1"])
+    assert watermarks.known_keys("owner@example.com") == ["e:1", "c:2", "b:1", "a:1"]
+
+    # A scan that ended without reaching a known key replaces the old keys
+    watermarks.advance("owner@example.com", ["f:1", "e:1"])
+    assert watermarks.known_keys("owner@example.com") == ["f:1", "e:1", "c:2", "b:1", "a:1"]
+    watermarks.advance("owner@example.com", ["g:1"])
+    assert watermarks.known_keys("owner@example.com") == ["g:1"]
+
+
+def test_watermark_is_truncated_to_its_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "inbox_watermark_size", 3)
+    watermarks = InboxWatermarkIndex(str(tmp_path / "messages.db"))
+    watermarks.advance("owner@example.com", ["c:1", "b:1", "a:1"])
+
+    watermarks.advance("owner@example.com", ["e:1", "d:1", "c:1"])
+    assert watermarks.known_keys("owner@example.com") == ["e:1", "d:1", "c:1"]
+
+
+def test_empty_scan_keeps_the_watermark(tmp_path):
+    watermarks = InboxWatermarkIndex(str(tmp_path / "messages.db"))
+    watermarks.advance("owner@example.com", ["b:1", "a:1"])
+    watermarks.advance("owner@example.com", [])
+
+    assert watermarks.known_keys("owner@example.com") == ["b:1", "a:1"]
+    assert watermarks.known_keys("other@example.com") == []
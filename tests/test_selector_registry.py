@@ -0,0 +1,86 @@
+import json
+import multiprocessing
+
+from config import settings
+from selector_registry import SelectorRegistry
+
+PAGE = "inbox_ready"
+LIST = '[data-testid="message-list"]'
+PREVIEW = '[data-testid="message-preview"]'
+
+
+def record_hits(path: str, selector: str, hits: int):
+    """Run in a separate process, saving after every hit"""
+    settings.selector_save_interval = 0
+    registry = SelectorRegistry(path)
+    for _ in range(hits):
+        registry.record_hit(PAGE, selector)
+
+
+def stored(path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_saves_merge_the_counts_of_every_registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "selector_save_interval", 3600)
+    path = str(tmp_path / "selector_stats.json")
+    first, second = SelectorRegistry(path), SelectorRegistry(path)
+
+    first.record_hit(PAGE, LIST)
+    second.record_hit(PAGE, LIST)
+    for _ in range(3):
+        first.record_hit(PAGE, LIST)
+        second.record_miss(PAGE)
+    first.flush()
+    second.flush()
+
+    page = stored(path)[PAGE]
+    assert page["selectors"] == {LIST: 5}
+    assert page["misses"] == 3
+    # The registry that saw the page last decides its state
+    assert page["consecutive_misses"] == 3
+    assert second.stats()[PAGE]["selectors"] == {LIST: 5}
+
+    # Nothing unsaved, nothing counted twice
+    first.flush()
+    second.flush()
+    assert stored(path)[PAGE]["selectors"] == {LIST: 5}
+
+
+def test_only_a_promotion_replaces_the_stored_winner(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "selector_save_interval", 3600)
+    monkeypatch.setattr(settings, "selector_demote_after", 1)
+    path = str(tmp_path / "selector_stats.json")
+    stale, current = SelectorRegistry(path), SelectorRegistry(path)
+    stale.record_hit(PAGE, LIST)
+    current.record_hit(PAGE, LIST)
+
+    # Promotions are saved at once
+    current.record_hit(PAGE, PREVIEW)
+    assert stored(path)[PAGE]["winner"] == PREVIEW
+
+    # A process that has not seen the promotion yet saves later, without undoing it
+    stale.record_hit(PAGE, LIST)
+    stale.flush()
+
+    assert stored(path)[PAGE]["winner"] == PREVIEW
+    assert stored(path)[PAGE]["selectors"] == {LIST: 3, PREVIEW: 1}
+    assert stale.stats()[PAGE]["winner"] == PREVIEW
+
+
+def test_concurrent_processes_lose_no_counts(tmp_path):
+    path = str(tmp_path / "selector_stats.json")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=record_hits, args=(path, selector, 40))
+        for selector in (LIST, LIST, PREVIEW, PREVIEW)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    assert stored(path)[PAGE]["selectors"] == {LIST: 80, PREVIEW: 80}
+    assert not list(tmp_path.glob("*.tmp"))
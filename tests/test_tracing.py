@@ -0,0 +1,40 @@
+import multiprocessing
+
+from tracing import TraceRecorder, span
+
+
+def record_run(directory: str, name: str):
+    """Run in a separate process, like an account worker"""
+    with TraceRecorder(directory).record(name):
+        with span("step"):
+            pass
+
+
+def test_lists_traces_written_by_other_processes(tmp_path):
+    directory = str(tmp_path / "traces")
+    recorder = TraceRecorder(directory, history=5)
+    with recorder.record("own_run"):
+        pass
+
+    process = multiprocessing.get_context("spawn").Process(target=record_run, args=(directory, "worker_run"))
+    process.start()
+    process.join(60)
+    assert process.exitcode == 0
+
+    traces = recorder.list()
+    assert [trace["name"] for trace in traces] == ["worker_run", "own_run"]
+    assert traces[0]["events"] == 2
+    assert recorder.get(traces[0]["trace_id"])["otherData"] == traces[0]
+    assert not list(tmp_path.glob("traces/*.tmp"))
+
+
+def test_keeps_the_newest_trace_files(tmp_path):
+    directory = str(tmp_path / "traces")
+    recorder = TraceRecorder(directory, history=3)
+    for number in range(5):
+        with recorder.record(f"run_{number}"):
+            pass
+
+    assert [trace["name"] for trace in recorder.list()] == ["run_4", "run_3", "run_2"]
+    assert [trace["name"] for trace in recorder.list(limit=2)] == ["run_4", "run_3"]
+    assert len(list(tmp_path.glob("traces/*.json"))) == 3
@@ -0,0 +1,112 @@
+import json
+import shutil
+import subprocess
+from typing import Any, Dict, List
+
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+
+from config import settings
+from zillow_selenium_scraper import INBOX_EXTRACTION_SCRIPT, ZillowSeleniumScraper
+
+
+class Page:
+    def __init__(self, url: str):
+        self.current_url = url
+
+
+class ThreadItem:
+    """A message item of the thread shown before the click"""
+
+    def __init__(self):
+        self.detached = False
+
+    def is_enabled(self) -> bool:
+        if self.detached:
+            raise StaleElementReferenceException()
+        return True
+
+
+def test_conversation_ready_waits_for_the_previous_thread_to_go():
+    previous = ThreadItem()
+    ready = ZillowSeleniumScraper._conversation_ready("202", previous)
+
+    # The URL changes on click while the old thread is still showing
+    assert not ready(Page("https://www.zillow.com/rental-manager/inbox/202/"))
+
+    previous.detached = True
+    assert not ready(Page("https://www.zillow.com/rental-manager/inbox/101/"))
+    assert ready(Page("https://www.zillow.com/rental-manager/inbox/202/"))
+
+
+def test_conversation_ready_without_a_previous_thread_checks_the_url():
+    ready = ZillowSeleniumScraper._conversation_ready("202", None)
+
+    assert not ready(Page("about:blank"))
+    assert ready(Page("https://www.zillow.com/rental-manager/inbox/202/"))
+
+
+
+# Runs the page script given on stdin in node, against a stand-in inbox DOM
+NODE_INBOX_PAGE = """
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const text = value => value === null ? null : {innerText: value};
+const item = conversation => ({
+    id: conversation.id,
+    querySelector(selector) {
+        switch (selector) {
+            case '[data-testid="participant-name"]': return text(conversation.prospect_name);
+            case '[data-testid="message-preview"]': return {querySelector: () => text(conversation.message_content)};
+            case '[data-testid="address"]': return text(conversation.property_address);
+            case '[data-testid="unread-badge"]': return conversation.unread ? {} : null;
+        }
+        return null;
+    }
+});
+globalThis.document = {querySelectorAll: () => input.conversations.map(item)};
+process.stdout.write(JSON.stringify(new Function(input.script).apply(null, input.args)));
+"""
+
+
+class NodeInboxDriver:
+    """Driver whose inbox extraction script runs in node; the list never scrolls"""
+
+    def __init__(self, conversations: List[Dict[str, Any]]):
+        self.conversations = conversations
+
+    def execute_script(self, script: str, *args):
+        if script != INBOX_EXTRACTION_SCRIPT:
+            return False
+        payload = {"conversations": self.conversations, "args": list(args), "script": script}
+        output = subprocess.run(["node", "-e", NODE_INBOX_PAGE], input=json.dumps(payload),
+                                capture_output=True, text=True, check=True).stdout
+        return json.loads(output)
+
+
+def conversation(conversation_id: str, message_content: str, unread: bool = True) -> Dict[str, Any]:
+    return {"id": conversation_id, "prospect_name": "Ana", "message_content": message_content,
+            "property_address": "1 Example St #1", "unread": unread}
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run the page script")
+def test_scan_stops_at_the_first_unchanged_known_item(monkeypatch):
+    monkeypatch.setattr(settings, "inbox_scan_batch_size", 2)
+    inbox = [conversation("105", "Tour?"), conversation("104", "Pets?", unread=False),
+             conversation("103", "Apply?"), conversation("102", "Rent?"), conversation("101", "Hi")]
+    scraper = ZillowSeleniumScraper()
+    scraper.driver = NodeInboxDriver(inbox)
+
+    first = list(scraper.iter_unread_messages([]))
+    assert [message.conversation_id for message in first] == ["105", "103", "102", "101"]
+    known_keys = scraper.scanned_keys()
+    assert [key.split(":")[0] for key in known_keys] == ["105", "104", "103", "102", "101"]
+
+    # A new conversation on top and a new message in 103, which moves up the list
+    inbox[:] = [conversation("106", "Parking?"), conversation("103", "Apply today?"),
+                conversation("105", "Tour?"), conversation("104", "Pets?", unread=False),
+                conversation("102", "Rent?"), conversation("101", "Hi")]
+    second = list(scraper.iter_unread_messages(known_keys))
+
+    assert [message.conversation_id for message in second] == ["106", "103"]
+    # The scan ended at 105, the first item whose key it already knew
+    assert scraper.scanned_keys()[-1] == known_keys[0]
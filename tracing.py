@@ -0,0 +1,187 @@
+"""Per-run timelines in Chrome trace-event format.
+
+A processing run records nested spans for its phases, every WebDriver
+command and every sleep. Finished traces are kept in memory and written to
+settings.trace_dir; open one in chrome://tracing or https://ui.perfetto.dev.
+"""
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from loguru import logger
+from config import settings
+
+_local = threading.local()
+
+
+class Trace:
+    """Spans recorded by one run, all on the thread that started it"""
+
+    def __init__(self, name: str, max_events: int):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = datetime.now()
+        self.max_events = max_events
+        self.events: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.duration = 0.0
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def add(self, name: str, category: str, start: float, end: float, args: Dict[str, Any]):
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": round(self.duration, 3),
+            "events": len(self.events),
+            "dropped_events": self.dropped,
+        }
+
+    def to_chrome(self) -> Dict[str, Any]:
+        return {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": self.summary(),
+        }
+
+
+@contextmanager
+def span(name: str, category: str = "app", **args) -> Iterator[None]:
+    """Record a span on the current thread's trace, a no-op outside a recorded run"""
+    trace: Optional[Trace] = getattr(_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, category, start, time.perf_counter(), args)
+
+
+def traced_sleep(seconds: float):
+    """time.sleep that shows up on the run's timeline"""
+    with span("sleep", "sleep", seconds=round(seconds, 3)):
+        time.sleep(seconds)
+
+
+def trace_webdriver(driver):
+    """Record every WebDriver command the driver sends as a span"""
+    execute = driver.execute
+
+    def traced_execute(driver_command: str, params: Optional[Dict[str, Any]] = None):
+        with span(driver_command, "webdriver"):
+            return execute(driver_command, params)
+
+    driver.execute = traced_execute
+    return driver
+
+
+class TraceRecorder:
+    """Keeps the most recent run traces in memory and on disk"""
+
+    def __init__(self, directory: Optional[str] = None, history: Optional[int] = None):
+        self.directory = directory or settings.trace_dir
+        self.history = history or settings.trace_history
+        self._traces: Deque[Trace] = deque(maxlen=self.history)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def record(self, name: str, **args) -> Iterator[Optional[Trace]]:
+        """Trace a run; nested calls on the same thread become spans of the outer run"""
+        if not settings.tracing_enabled or getattr(_local, "trace", None) is not None:
+            with span(name, "run", **args):
+                yield getattr(_local, "trace", None)
+            return
+
+        trace = Trace(name, settings.trace_max_events)
+        _local.trace = trace
+        try:
+            with span(name, "run", **args):
+                yield trace
+        finally:
+            _local.trace = None
+            trace.duration = time.perf_counter() - trace._origin
+            with self._lock:
+                self._traces.append(trace)
+            self._write(trace)
+
+    def _write(self, trace: Trace):
+        path = os.path.join(self.directory, f"{trace.trace_id}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Other processes list the directory, so a trace file appears only once complete
+            with open(tmp_path, "w") as f:
+                json.dump(trace.to_chrome(), f)
+            os.replace(tmp_path, path)
+            for stale in self._files()[self.history:]:
+                os.remove(stale)
+        except OSError as e:
+            logger.warning(f"Failed to write trace {trace.trace_id}: {e}")
+
+    def _files(self) -> List[str]:
+        """Trace files in the directory, newest first"""
+        def modified(path: str) -> float:
+            try:
+                return os.path.getmtime(path)
+            except OSError:  # Pruned by another process meanwhile
+                return 0.0
+        return sorted(glob.glob(os.path.join(self.directory, "*.json")), key=modified, reverse=True)
+
+    def list(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Summaries of the most recent traces, newest first
+
+        Read from the trace directory, so runs recorded by worker processes are listed too.
+        """
+        summaries: Dict[str, Dict[str, Any]] = {}
+        for path in self._files()[:limit]:
+            try:
+                with open(path) as f:
+                    summary = json.load(f)["otherData"]
+                summaries[summary["trace_id"]] = summary
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        # Traces whose file could not be written are still in memory
+        with self._lock:
+            for trace in self._traces:
+                summaries.setdefault(trace.trace_id, trace.summary())
+        listed = sorted(summaries.values(), key=lambda summary: summary["started_at"], reverse=True)
+        return listed[:limit]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """A trace in Chrome trace-event format, from memory or from disk"""
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace.to_chrome()
+        try:
+            with open(os.path.join(self.directory, f"{os.path.basename(trace_id)}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+trace_recorder = TraceRecorder()
@@ -1,8 +1,12 @@
 import time
 import random
+import hashlib
+import fnmatch
+import os
+import shutil
 import asyncio
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -15,14 +19,211 @@ import undetected_chromedriver as uc
 from selenium_stealth import stealth
 from loguru import logger
 from models import ZillowMessage, MessageStatus
+from inbox_backend import InboxBackend
 from config import settings
+from session_store import session_store
+from selector_registry import FIRST_MATCH_SCRIPT, selector_registry
+from metrics import BROWSERS_LIVE, NAVIGATION_BYTES, NAVIGATION_INTERACTIVE, observe_stage
+from tracing import span, trace_webdriver, traced_sleep
+from driver_lifecycle import driver_lifecycle
 
-class ZillowSeleniumScraper:
+# Collects up to arguments[2] unread conversation items not in arguments[1]
+# (ids walked earlier in this scan) and their fields in one round trip.
+# innerText mirrors what WebElement.text returns for the per-element path.
+# The list is ordered by latest activity, so the walk stops at the first item
+# whose key (id plus a hash of name and preview) is in arguments[0]: that item
+# and everything below it are unchanged since the last scan.
+INBOX_EXTRACTION_SCRIPT = """
+const known = new Set(arguments[0] || []);
+const seen = new Set(arguments[1] || []);
+const limit = arguments[2] || Infinity;
+const text = (root, selector) => {
+    const el = root ? root.querySelector(selector) : null;
+    return el ? el.innerText.trim() : null;
+};
+const fnv1a = value => {
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < value.length; i++) {
+        hash = Math.imul(hash ^ value.charCodeAt(i), 0x01000193) >>> 0;
+    }
+    return hash.toString(16);
+};
+const items = document.querySelectorAll('[data-testid="conversation-item"]');
+const rows = [];
+const keys = [];
+for (const item of items) {
+    if (seen.has(item.id)) {
+        continue;
+    }
+    if (keys.length >= limit) {
+        return {rows: rows, keys: keys, stopped: false, exhausted: false};
+    }
+    const prospectName = text(item, '[data-testid="participant-name"]');
+    const preview = item.querySelector('[data-testid="message-preview"]');
+    const messageContent = text(preview, 'p[data-c11n-component="Paragraph"]');
+    const key = item.id + ':' + fnv1a(prospectName + '\\n' + messageContent);
+    keys.push(key);
+    if (known.has(key)) {
+        return {rows: rows, keys: keys, stopped: true, exhausted: false};
+    }
+    if (!item.querySelector('[data-testid="unread-badge"]')) {
+        continue;
+    }
+    rows.push({
+        id: item.id,
+        prospect_name: prospectName,
+        message_content: messageContent,
+        property_address: text(item, '[data-testid="address"]')
+    });
+}
+return {
+    rows: rows,
+    keys: keys,
+    stopped: false,
+    exhausted: true,
+    last_id: items.length ? items[items.length - 1].id : null
+};
+"""
+
+# Scrolls the conversation list (or the page) down by one screen so a
+# virtualized list renders its next items. Returns whether it moved.
+INBOX_SCROLL_SCRIPT = """
+const first = document.querySelector('[data-testid="conversation-item"]');
+if (!first) {
+    return false;
+}
+let list = first.parentElement;
+while (list && list !== document.body) {
+    const overflow = getComputedStyle(list).overflowY;
+    if (list.scrollHeight > list.clientHeight && (overflow === 'auto' || overflow === 'scroll')) {
+        break;
+    }
+    list = list.parentElement;
+}
+const scroller = list && list !== document.body ? list : document.scrollingElement;
+const before = scroller.scrollTop;
+scroller.scrollTop = before + scroller.clientHeight;
+return scroller.scrollTop > before;
+"""
+
+LAST_CONVERSATION_ID_SCRIPT = """
+const items = document.querySelectorAll('[data-testid="conversation-item"]');
+return items.length ? items[items.length - 1].id : null;
+"""
+
+# Size and timing of the current document's load, from the Navigation and
+# Resource Timing APIs. Cross-origin resources without Timing-Allow-Origin
+# report a transferSize of 0, so bytes are a lower bound.
+NAVIGATION_STATS_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation')[0];
+if (!navigation) {
+    return null;
+}
+const resources = performance.getEntriesByType('resource');
+return {
+    transfer_bytes: navigation.transferSize + resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+    resources: resources.length,
+    interactive_ms: navigation.domInteractive,
+    dom_content_loaded_ms: navigation.domContentLoadedEventEnd
+};
+"""
+
+# Chrome switches for every launch. Chrome only honors the last
+# --disable-features switch, so the features are listed in one.
+CHROME_ARGUMENTS = (
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-features=VizDisplayCompositor,TranslateUI,AudioServiceOutOfProcess',
+    '--disable-extensions',
+    '--disable-plugins',
+    '--disable-plugins-discovery',
+    '--disable-web-security',
+    '--disable-ipc-flooding-protection',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-default-apps',
+    '--disable-popup-blocking',
+    '--disable-prompt-on-repost',
+    '--disable-hang-monitor',
+    '--disable-sync',
+    '--disable-translate',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-client-side-phishing-detection',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-domain-reliability',
+    '--disable-background-networking',
+    '--disable-windows10-custom-titlebar',
+    '--disable-automation',
+    '--disable-preconnect',
+    '--disable-print-preview',
+    '--disable-save-password-bubble',
+    '--disable-single-click-autofill',
+    '--disable-speech-api',
+    '--disable-xss-auditor',
+    '--metrics-recording-only',
+    '--safebrowsing-disable-auto-update',
+    '--password-store=basic',
+    '--use-mock-keychain',
+    '--window-size=1920,1080',
+)
+
+ALREADY_REPLIED_XPATH = ("//li[@data-testid='message-item' and contains(@aria-label, 'You sent')][last()]"
+                         "//div[@data-testid='chat-bubble']/p")
+
+SENT_MESSAGE_SELECTOR = "li[data-testid='message-item'][aria-label*='You sent']"
+
+# Resolves true once more sent bubbles exist than before the click, false on timeout
+SENT_BUBBLE_OBSERVER_SCRIPT = """
+const [selector, sentBefore, timeoutMs, done] = arguments;
+const confirmed = () => document.querySelectorAll(selector).length > sentBefore;
+if (confirmed()) {
+    return done(true);
+}
+const observer = new MutationObserver(() => {
+    if (confirmed()) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+const timer = setTimeout(() => {
+    observer.disconnect();
+    done(false);
+}, timeoutMs);
+observer.observe(document.body, {childList: true, subtree: true, attributes: true});
+"""
+
+# Sets a field through the element prototype's native value setter, which
+# framework-controlled inputs observe, then fires the events a keystroke would
+NATIVE_VALUE_SCRIPT = """
+const [element, text] = arguments;
+const prototype = element instanceof HTMLTextAreaElement
+    ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+element.focus();
+Object.getOwnPropertyDescriptor(prototype, 'value').set.call(element, text);
+element.dispatchEvent(new Event('input', {bubbles: true}));
+element.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+ENTRY_STRATEGIES = ("human", "bulk", "native")
+
+class ZillowSeleniumScraper(InboxBackend):
     """Selenium-based Zillow message scraper with advanced anti-detection"""
     
     def __init__(self):
         self.driver: Optional[webdriver.Chrome] = None
         self.is_logged_in = False
+        self.logged_in_email: Optional[str] = None
+        self.wait_timings: Dict[str, float] = {}
+        self.entry_timings: Dict[str, float] = {}
+        self._scanned_keys: List[str] = []
+        self._last_scanned_key: Optional[str] = None
+        self.navigation_stats: Dict[str, Dict[str, float]] = {}
+        # Persistent user-data-dir, set by the browser pool for each of its slots
+        self.profile_dir: Optional[str] = None
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
@@ -31,91 +232,16 @@ class ZillowSeleniumScraper:
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
         ]
     
-    def initialize(self):
+    @observe_stage("initialize")
+    def initialize(self, email: Optional[str] = None):
         """Initialize undetected Chrome driver with stealth settings"""
         try:
-            # Use undetected-chromedriver for better evasion
-            options = uc.ChromeOptions()
-            
-            # Basic options
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-features=VizDisplayCompositor')
-            options.add_argument('--disable-extensions')
-            options.add_argument('--disable-plugins')
-            options.add_argument('--disable-web-security')
-            options.add_argument('--disable-features=TranslateUI')
-            options.add_argument('--disable-ipc-flooding-protection')
-            options.add_argument('--no-first-run')
-            options.add_argument('--no-default-browser-check')
-            options.add_argument('--disable-default-apps')
-            options.add_argument('--disable-popup-blocking')
-            options.add_argument('--disable-prompt-on-repost')
-            options.add_argument('--disable-hang-monitor')
-            options.add_argument('--disable-sync')
-            options.add_argument('--disable-translate')
-            options.add_argument('--disable-background-timer-throttling')
-            options.add_argument('--disable-renderer-backgrounding')
-            options.add_argument('--disable-backgrounding-occluded-windows')
-            options.add_argument('--disable-client-side-phishing-detection')
-            options.add_argument('--disable-component-extensions-with-background-pages')
-            options.add_argument('--disable-domain-reliability')
-            options.add_argument('--disable-features=AudioServiceOutOfProcess')
-            options.add_argument('--metrics-recording-only')
-            options.add_argument('--safebrowsing-disable-auto-update')
-            options.add_argument('--password-store=basic')
-            options.add_argument('--use-mock-keychain')
-            options.add_argument('--disable-background-networking')
-            options.add_argument('--disable-windows10-custom-titlebar')
-            
-            # Anti-detection options
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-automation')
-            options.add_argument('--disable-plugins-discovery')
-            options.add_argument('--disable-preconnect')
-            options.add_argument('--disable-print-preview')
-            options.add_argument('--disable-save-password-bubble')
-            options.add_argument('--disable-single-click-autofill')
-            options.add_argument('--disable-speech-api')
-            options.add_argument('--disable-web-security')
-            options.add_argument('--disable-xss-auditor')
-            options.add_argument('--disable-ipc-flooding-protection')
-            options.add_argument('--disable-renderer-backgrounding')
-            options.add_argument('--disable-backgrounding-occluded-windows')
-            options.add_argument('--disable-client-side-phishing-detection')
-            options.add_argument('--disable-component-extensions-with-background-pages')
-            options.add_argument('--disable-default-apps')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-extensions')
-            options.add_argument('--disable-features=TranslateUI')
-            options.add_argument('--disable-hang-monitor')
-            options.add_argument('--disable-ipc-flooding-protection')
-            options.add_argument('--disable-popup-blocking')
-            options.add_argument('--disable-prompt-on-repost')
-            options.add_argument('--disable-sync')
-            options.add_argument('--disable-translate')
-            options.add_argument('--disable-windows10-custom-titlebar')
-            options.add_argument('--metrics-recording-only')
-            options.add_argument('--no-first-run')
-            options.add_argument('--safebrowsing-disable-auto-update')
-            options.add_argument('--password-store=basic')
-            options.add_argument('--use-mock-keychain')
-            
-            # User agent
-            options.add_argument(f'--user-agent={random.choice(self.user_agents)}')
-            
-            # Window size
-            options.add_argument('--window-size=1920,1080')
-            
-            # Headless mode
-            if settings.headless:
-                options.add_argument('--headless=new')
-            
-            # Initialize undetected Chrome driver
-
-            # self.driver = uc.Chrome(options=options, version_main=None)
-            self.driver = uc.Chrome()
+            self.driver = self._launch_chrome()
+            trace_webdriver(self.driver)
+            BROWSERS_LIVE.inc()
+            driver_lifecycle.register(self)
+            if settings.lean_page_load:
+                self._block_heavy_resources()
             # Apply stealth settings
             stealth(self.driver,
                 languages=["en-US", "en"],
@@ -166,13 +292,209 @@ class ZillowSeleniumScraper:
         except Exception as e:
             logger.error(f"Failed to initialize Selenium driver: {e}")
             raise
+        
+        # Reuse a stored session so the form login can be skipped
+        if email:
+            self.restore_session(email)
+    
+    def chrome_options(self) -> uc.ChromeOptions:
+        """Build the options for one launch, uc refuses to reuse an options object"""
+        options = uc.ChromeOptions()
+        for argument in CHROME_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_argument(f'--user-agent={random.choice(self.user_agents)}')
+        if settings.lean_page_load:
+            # Return from navigations at DOMContentLoaded, text and forms are usable by then
+            options.page_load_strategy = "eager"
+        return options
+    
+    def _launch_chrome(self):
+        """Start Chrome with the built options, reusing the cached patched driver"""
+        launch_args = {"headless": settings.headless}
+        if self.profile_dir:
+            # A persistent profile keeps the HTTP cache and service workers warm
+            os.makedirs(self.profile_dir, exist_ok=True)
+            launch_args["user_data_dir"] = os.path.abspath(self.profile_dir)
+        
+        cache_path = settings.chromedriver_cache_path
+        if cache_path and os.path.exists(cache_path):
+            try:
+                # uc only patches a custom driver path if it is not patched yet
+                return uc.Chrome(options=self.chrome_options(),
+                                 driver_executable_path=os.path.abspath(cache_path), **launch_args)
+            except Exception as e:
+                # Usually a Chrome update the cached driver does not support
+                logger.warning(f"Cached chromedriver failed to start, fetching a new one: {e}")
+                os.remove(cache_path)
+        
+        driver = uc.Chrome(options=self.chrome_options(), **launch_args)
+        if cache_path:
+            self._cache_patched_driver(driver.patcher.executable_path, cache_path)
+        return driver
+    
+    @staticmethod
+    def _cache_patched_driver(source: str, cache_path: str):
+        """Keep a copy of the driver uc just downloaded and patched for later launches"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            shutil.copy2(source, tmp_path)
+            os.replace(tmp_path, cache_path)
+            logger.info(f"Cached patched chromedriver at {cache_path}")
+        except OSError as e:
+            logger.warning(f"Failed to cache the patched chromedriver: {e}")
+    
+    @staticmethod
+    def lean_blocked_url_patterns() -> List[str]:
+        """Block patterns for lean mode, minus those the allowlist exempts
+        
+        Network.setBlockedURLs has no exceptions, so an allowlisted pattern
+        removes the block patterns it covers: it is matched one way, against
+        the block pattern read as a URL, so "*.svg" exempts "*.svg" but a
+        single allowed URL never unblocks a whole category. Chrome matches
+        patterns against the full URL including its query string, so every
+        pattern without a trailing wildcard is also blocked with "?*"
+        appended ("*.png" covers "a.png?w=200" too).
+        """
+        allowed = settings.lean_allowed_url_patterns
+        patterns = []
+        for pattern in settings.lean_blocked_url_patterns:
+            if any(fnmatch.fnmatchcase(pattern, allow) for allow in allowed):
+                continue
+            patterns.append(pattern)
+            if not pattern.endswith("*"):
+                patterns.append(f"{pattern}?*")
+        return patterns
+    
+    def _block_heavy_resources(self):
+        """Drop images, media, fonts and trackers at the network layer through CDP
+        
+        The blocking applies to the current window's target only, every new
+        window needs its own call before it starts loading.
+        """
+        patterns = self.lean_blocked_url_patterns()
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            logger.debug(f"Lean page loads: blocking {len(patterns)} URL patterns")
+        except Exception as e:
+            logger.warning(f"Failed to enable lean page loads: {e}")
+    
+    def record_navigation(self, page: str) -> Optional[Dict[str, float]]:
+        """Record bytes transferred and time to interactive of the page just loaded"""
+        try:
+            stats = self.driver.execute_script(NAVIGATION_STATS_SCRIPT)
+        except Exception as e:
+            logger.debug(f"Navigation stats unavailable for {page}: {e}")
+            return None
+        if not stats:
+            return None
+        self.navigation_stats[page] = stats
+        NAVIGATION_BYTES.labels(page).observe(stats["transfer_bytes"])
+        NAVIGATION_INTERACTIVE.labels(page).observe(stats["interactive_ms"] / 1000)
+        logger.debug(f"Loaded {page}: {stats['transfer_bytes'] / 1024:.0f} KiB in "
+                     f"{stats['resources']} resources, interactive after {stats['interactive_ms']:.0f} ms")
+        return stats
+    
+    def restore_session(self, email: str) -> bool:
+        """Restore stored cookies and local storage, then probe the inbox"""
+        session = session_store.load(email)
+        if not session:
+            session_store.record_miss()
+            return False
+        
+        try:
+            # Cookies and local storage can only be set on the site's origin,
+            # robots.txt is the lightest page that gets us there
+            self.driver.get(f"{settings.zillow_base_url}/robots.txt")
+            
+            now = time.time()
+            for cookie in session.get("cookies", []):
+                if cookie.get("expiry") and cookie["expiry"] < now:
+                    continue
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception as e:
+                    logger.debug(f"Skipping cookie {cookie.get('name')}: {e}")
+            
+            local_storage = session.get("local_storage") or {}
+            if local_storage:
+                self.driver.execute_script(
+                    "for (const [k, v] of Object.entries(arguments[0])) {"
+                    " window.localStorage.setItem(k, v); }",
+                    local_storage
+                )
+        except Exception as e:
+            logger.warning(f"Failed to restore stored session: {e}")
+            session_store.record_miss()
+            return False
+        
+        if self.verify_session():
+            self.logged_in_email = email
+            session_store.record_hit()
+            logger.info(f"Restored stored session for {email}")
+            return True
+        
+        logger.info(f"Stored session for {email} is no longer valid")
+        session_store.record_miss()
+        session_store.delete(email)
+        return False
+    
+    def save_session(self, email: str):
+        """Persist the current cookies and local storage for the account"""
+        try:
+            cookies = self.driver.get_cookies()
+            local_storage = self.driver.execute_script(
+                "return Object.fromEntries(Object.entries(window.localStorage));"
+            ) or {}
+            session_store.save(email, cookies, local_storage)
+        except Exception as e:
+            logger.warning(f"Failed to save session: {e}")
+    
+    def wait_for(self, step: str, condition, timeout: Optional[float] = None):
+        """Wait until a readiness condition holds, recording how long the step waited"""
+        start = time.perf_counter()
+        try:
+            with span(f"wait:{step}", "wait"):
+                return WebDriverWait(
+                    self.driver,
+                    timeout if timeout is not None else settings.page_ready_timeout,
+                    poll_frequency=settings.wait_poll_interval
+                ).until(condition)
+        finally:
+            self.wait_timings[step] = time.perf_counter() - start
+            logger.debug(f"Waited {self.wait_timings[step]:.2f}s for {step}")
+    
+    def resolve_selector(self, page_type: str, selectors: List[str], timeout: float,
+                         ready=None) -> Optional[str]:
+        """Wait for whichever candidate selector appears first, as one combined condition
+        
+        Candidates are tried in the registry's order (last winner first) on
+        every poll, and page types that have not matched recently get a short
+        timeout instead of the full one.
+        """
+        ordered = selector_registry.candidates(page_type, selectors)
+        
+        def condition(driver):
+            index = driver.execute_script(FIRST_MATCH_SCRIPT, ordered)
+            if index < 0 or (ready and not ready(driver)):
+                return False
+            return ordered[index]
+        
+        try:
+            selector = self.wait_for(page_type, condition, timeout=selector_registry.timeout(page_type, timeout))
+        except TimeoutException:
+            selector_registry.record_miss(page_type)
+            return None
+        selector_registry.record_hit(page_type, selector)
+        return selector
     
     def human_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
         """Add human-like random delays"""
         if not settings.human_delays:
             return
         delay = random.uniform(min_seconds, max_seconds)
-        time.sleep(delay)
+        traced_sleep(delay)
     
     def human_type(self, element, text: str):
         """Type text with human-like delays between keystrokes"""
@@ -182,7 +504,30 @@ class ZillowSeleniumScraper:
         for char in text:
             element.send_keys(char)
             if settings.human_delays:
-                time.sleep(random.uniform(0.05, 0.15))
+                traced_sleep(random.uniform(0.05, 0.15))
+    
+    def enter_text(self, step: str, element, text: str, strategy: str):
+        """Fill a field using an entry strategy, recording how long the step took
+        
+        "human" types one key at a time, "bulk" sends the whole string in a
+        single send_keys call and "native" sets the value in one script call.
+        """
+        if strategy not in ENTRY_STRATEGIES:
+            raise ValueError(f"Unknown entry strategy {strategy!r}, expected one of {ENTRY_STRATEGIES}")
+        
+        start = time.perf_counter()
+        try:
+            if strategy == "human":
+                self.human_type(element, text)
+            elif strategy == "bulk":
+                element.click()
+                element.send_keys(text)
+            else:
+                self.driver.execute_script(NATIVE_VALUE_SCRIPT, element, text)
+        finally:
+            self.entry_timings[step] = time.perf_counter() - start
+            logger.debug(f"Entered {len(text)} characters for {step} in "
+                         f"{self.entry_timings[step]:.2f}s ({strategy})")
     
     def human_click(self, element):
         """Click element with human-like behavior"""
@@ -195,70 +540,63 @@ class ZillowSeleniumScraper:
         actions.click(element).perform()
         self.human_delay(0.5, 1.5)
     
+    @observe_stage("login")
     def login(self, email: str, password: str) -> bool:
         """Login to Zillow with human-like behavior"""
         try:
             if not self.driver:
-                self.initialize()
+                self.initialize(email)
             
-            logger.info("Navigating to Zillow login page")
-            self.driver.get("https://www.zillow.com/user/acct/login?url=%2Frental-manager%2Finbox%3Fap%3Dx")
-            self.human_delay(2, 4)
+            if self.is_logged_in and self.logged_in_email == email:
+                logger.info("Already logged in with a restored session")
+                return True
             
-            # Wait for page to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            if self.logged_in_email and self.logged_in_email != email:
+                # The login page would just redirect the other account's session to its inbox
+                logger.info(f"Switching accounts, signing out {self.logged_in_email}")
+                self._clear_cookies()
+            # Only a completed login below may set these again
+            self.is_logged_in = False
+            self.logged_in_email = None
             
-            # Wait for page to fully load
-            self.human_delay(1, 2)
+            logger.info("Navigating to Zillow login page")
+            self.driver.get(f"{settings.zillow_base_url}/user/acct/login?url=%2Frental-manager%2Finbox%3Fap%3Dx")
             
-            # Fill login form with human-like behavior
+            # Fill login form with human-like behavior as soon as it renders
             try:
-                email_input = WebDriverWait(self.driver, 10).until(
+                email_input = self.wait_for(
+                    "login_form",
                     EC.presence_of_element_located((By.ID, "reg-login-email"))
                 )
-                self.human_type(email_input, email)
+                self.record_navigation("login")
+                self.human_delay(1, 2)
+                self.enter_text("login_email", email_input, email, settings.login_entry_strategy)
                 self.human_delay(1, 2)
                 
                 password_input = self.driver.find_element(By.ID, "inputs-password")
-                self.human_type(password_input, password)
+                self.enter_text("login_password", password_input, password, settings.login_entry_strategy)
                 self.human_delay(1, 3)
                 
                 # Click login button with human-like behavior
                 login_button = self.driver.find_element(By.CSS_SELECTOR, 'input[type="submit"]')
                 self.human_click(login_button)
                 
-                # Wait for login to process
-                self.human_delay(3, 5)
-                
-                # Check if login was successful
+                # Login succeeded once Zillow redirects to the rental-manager inbox
                 try:
-                    # Look for various success indicators
-                    success_selectors = [
-                        '.swipeable-list-item__content',
-                        '.rental-manager',
-                        '.inbox',
-                        '[data-testid="header"]',
-                        '.user-menu',
-                        '.profile-menu',
-                        '[data-testid="conversation-item"]'
-                    ]
-                    
-                    success = False
-                    time.sleep(5)
-                    if 'rental-manager/inbox' in self.driver.current_url:
-                        success = True
-                    
-                    if success:
-                        self.is_logged_in = True
-                        logger.info("Successfully logged in to Zillow")
-                        return True
-                    return False
-                        
-                except Exception as e:
-                    logger.error(f"Login verification failed: {e}")
+                    self.wait_for(
+                        "login_redirect",
+                        EC.url_contains('rental-manager/inbox'),
+                        timeout=settings.login_timeout
+                    )
+                except TimeoutException:
+                    logger.error(f"Login did not redirect to the inbox, still at {self.driver.current_url}")
                     return False
+                
+                self.is_logged_in = True
+                self.logged_in_email = email
+                logger.info("Successfully logged in to Zillow")
+                self.save_session(email)
+                return True
                     
             except TimeoutException:
                 logger.error("Login form elements not found")
@@ -268,6 +606,39 @@ class ZillowSeleniumScraper:
             logger.error(f"Login failed: {e}")
             return False
     
+    def _clear_cookies(self):
+        """Drop every cookie the browser holds, not just those of the current page"""
+        try:
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception:
+            self.driver.delete_all_cookies()
+    
+    def is_alive(self) -> bool:
+        """Cheap health check that the browser session still responds"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+    
+    def verify_session(self) -> bool:
+        """Probe the inbox to confirm the Zillow session is still authenticated"""
+        try:
+            self.driver.get(f"{settings.zillow_base_url}/rental-manager/inbox/")
+            self.wait_for("session_probe", EC.presence_of_element_located((By.TAG_NAME, "body")))
+            self.record_navigation("session_probe")
+            self.is_logged_in = 'rental-manager/inbox' in self.driver.current_url
+        except Exception as e:
+            logger.warning(f"Session probe failed: {e}")
+            self.is_logged_in = False
+        
+        if not self.is_logged_in:
+            self.logged_in_email = None
+        return self.is_logged_in
+    
+    @observe_stage("navigate_to_messages")
     def navigate_to_messages(self) -> bool:
         """Navigate to the messages section with human-like behavior"""
         try:
@@ -276,8 +647,7 @@ class ZillowSeleniumScraper:
                 return False
             
             logger.info("Navigating to messages section")
-            self.driver.get("https://www.zillow.com/rental-manager/inbox/")
-            self.human_delay(2, 4)
+            self.driver.get(f"{settings.zillow_base_url}/rental-manager/inbox/")
             
             # Wait for messages to load with multiple possible selectors
             message_selectors = [
@@ -289,16 +659,8 @@ class ZillowSeleniumScraper:
                 '.inbox'
             ]
             
-            messages_loaded = False
-            for selector in message_selectors:
-                try:
-                    WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    messages_loaded = True
-                    break
-                except TimeoutException:
-                    continue
+            messages_loaded = self.resolve_selector("inbox_ready", message_selectors, timeout=5) is not None
+            self.record_navigation("inbox")
             
             if messages_loaded:
                 logger.info("Successfully navigated to messages")
@@ -311,8 +673,111 @@ class ZillowSeleniumScraper:
             logger.error(f"Failed to navigate to messages: {e}")
             return False
     
-    def get_unread_messages(self) -> List[ZillowMessage]:
-        """Get all unread messages from the messages panel"""
+    def get_unread_messages(self, known_keys: Optional[List[str]] = None) -> List[ZillowMessage]:
+        """Get unread messages from the messages panel, newest activity first"""
+        return list(self.iter_unread_messages(known_keys))
+    
+    @observe_stage("get_unread_messages")
+    def iter_unread_messages(self, known_keys: Optional[List[str]] = None) -> Iterator[ZillowMessage]:
+        """Yield unread messages as the inbox list is walked and scrolled"""
+        self._scanned_keys = []
+        self._last_scanned_key = None
+        if settings.batched_inbox_extraction:
+            yielded = 0
+            try:
+                for message in self._iter_unread_messages_batched(known_keys):
+                    yielded += 1
+                    yield message
+                return
+            except Exception as e:
+                # Falling back halfway would hand out the same conversations twice
+                if yielded:
+                    raise
+                logger.warning(f"Batched inbox extraction failed, falling back to per-element lookups: {e}")
+        
+        yield from self._get_unread_messages_per_element()
+    
+    def scanned_keys(self) -> List[str]:
+        keys = list(self._scanned_keys)
+        if self._last_scanned_key:
+            keys.append(self._last_scanned_key)
+        return keys
+    
+    def _record_scanned(self, keys: List[str]):
+        """Keep the newest keys of the scan for the watermark, plus the one it ended at"""
+        for key in keys:
+            if len(self._scanned_keys) < settings.inbox_watermark_size:
+                self._scanned_keys.append(key)
+            else:
+                self._last_scanned_key = key
+    
+    def _get_unread_messages_batched(self, known_keys: Optional[List[str]] = None) -> List[ZillowMessage]:
+        """Extract unread conversations down to the first known item with batched script calls"""
+        return list(self._iter_unread_messages_batched(known_keys))
+    
+    def _iter_unread_messages_batched(self, known_keys: Optional[List[str]] = None) -> Iterator[ZillowMessage]:
+        """Walk the inbox a batch of items per script call, scrolling when the rendered items run out"""
+        seen_ids: List[str] = []
+        found = 0
+        while True:
+            with span("inbox_scan_batch", "scan"):
+                scan = self.driver.execute_script(
+                    INBOX_EXTRACTION_SCRIPT, known_keys or [], seen_ids, settings.inbox_scan_batch_size
+                ) or {}
+            keys = scan.get("keys") or []
+            self._record_scanned(keys)
+            seen_ids.extend(key.rsplit(":", 1)[0] for key in keys)
+            
+            for row in scan.get("rows") or []:
+                found += 1
+                yield self._message_from_row(row)
+            
+            if scan.get("stopped"):
+                logger.info(f"Found {found} unread messages, stopped at a known item "
+                            f"after {len(seen_ids)} conversations")
+                return
+            if scan.get("exhausted") and not self._scroll_inbox(scan.get("last_id")):
+                logger.info(f"Found {found} unread messages")
+                return
+    
+    def _scroll_inbox(self, last_id: Optional[str]) -> bool:
+        """Scroll the inbox list and wait for it to render items past last_id"""
+        if not self.driver.execute_script(INBOX_SCROLL_SCRIPT):
+            return False
+        try:
+            self.wait_for(
+                "inbox_scroll",
+                lambda driver: driver.execute_script(LAST_CONVERSATION_ID_SCRIPT) != last_id,
+                timeout=settings.inbox_scroll_timeout
+            )
+            return True
+        except TimeoutException:
+            # Nothing new rendered, the list was not virtualized or has ended
+            return False
+    
+    def _message_from_row(self, row: Dict[str, Optional[str]]) -> ZillowMessage:
+        prospect_name = row.get("prospect_name")
+        if prospect_name is None:
+            logger.warning("Could not find participant name")
+            prospect_name = "Unknown"
+        
+        message_content = row.get("message_content")
+        if message_content is None:
+            logger.warning("Could not find message content")
+            message_content = ""
+        
+        if row.get("property_address") is None:
+            logger.warning("Could not find property address")
+        
+        return self._build_message(
+            conversation_id=row.get("id"),
+            prospect_name=prospect_name,
+            message_content=message_content,
+            property_address=row.get("property_address")
+        )
+    
+    def _get_unread_messages_per_element(self) -> List[ZillowMessage]:
+        """Get unread messages by querying each conversation element through WebDriver"""
         try:
             messages = []
             
@@ -346,6 +811,7 @@ class ZillowSeleniumScraper:
             logger.error(f"Failed to get unread messages: {e}")
             return []
     
+    @observe_stage("_extract_message_data")
     def _extract_message_data(self, element) -> Optional[ZillowMessage]:
         """Extract message data from a message element"""
         try:
@@ -365,10 +831,6 @@ class ZillowSeleniumScraper:
                 # Get the paragraph that contains the actual message content
                 message_paragraph = message_preview.find_element(By.CSS_SELECTOR, 'p[data-c11n-component="Paragraph"]')
                 message_content = message_paragraph.text.strip()
-                
-                # Remove "You:" prefix if it exists (for sent messages)
-                if message_content.startswith("You:"):
-                    message_content = message_content[4:].strip()
                     
             except NoSuchElementException:
                 logger.warning("Could not find message content")
@@ -384,36 +846,10 @@ class ZillowSeleniumScraper:
             # Extract conversation ID from the li element's id attribute
             conversation_id = element.get_attribute('id')
             
-            # Build conversation URL (Zillow's pattern)
-            conversation_url = f"https://www.zillow.com/rental-manager/inbox/{conversation_id}/"
-            
-            # Extract message type from status label
-            message_type = None
-            try:
-                status_element = element.find_element(By.CSS_SELECTOR, '[data-testid="status-label"] span')
-                status_text = status_element.text.strip()
-                # Map Zillow status to our message types
-                if "APPLICATION REQUESTED" in status_text:
-                    message_type = "application_requested"
-                elif "TOUR REQUESTED" in status_text:
-                    message_type = "tour_requested"
-                elif "INQUIRY" in status_text:
-                    message_type = "general_inquiry"
-            except NoSuchElementException:
-                logger.warning("Could not find status label")
-            
-            # Generate a unique ID
-            message_id = f"zillow_{conversation_id}_{hash(prospect_name + message_content)}"
-            
-            logger.info(f"Extracted message: {prospect_name} - {message_content[:50]}...")
-            
-            return ZillowMessage(
-                id=message_id,
+            return self._build_message(
+                conversation_id=conversation_id,
                 prospect_name=prospect_name,
                 message_content=message_content,
-                status=MessageStatus.UNREAD,
-                timestamp=datetime.now(),
-                conversation_url=conversation_url,
                 property_address=property_address
             )
             
@@ -421,6 +857,41 @@ class ZillowSeleniumScraper:
             logger.error(f"Failed to extract message data: {e}")
             return None
     
+    @staticmethod
+    def message_digest(prospect_name: str, message_content: str) -> str:
+        """Stable content hash identifying a conversation's latest message"""
+        payload = f"{prospect_name}\x1f{message_content}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()[:16]
+    
+    def _build_message(self, conversation_id: str, prospect_name: str,
+                       message_content: str, property_address: Optional[str]) -> ZillowMessage:
+        """Build a ZillowMessage from the fields scraped off a conversation item"""
+        # Remove "You:" prefix if it exists (for sent messages)
+        if message_content.startswith("You:"):
+            message_content = message_content[4:].strip()
+        
+        # Build conversation URL (Zillow's pattern)
+        conversation_url = f"{settings.zillow_base_url}/rental-manager/inbox/{conversation_id}/"
+        
+        # Deterministic digest of the latest message, stable across restarts
+        message_digest = self.message_digest(prospect_name, message_content)
+        message_id = f"zillow_{conversation_id}_{message_digest}"
+        
+        logger.info(f"Extracted message: {prospect_name} - {message_content[:50]}...")
+        
+        return ZillowMessage(
+            id=message_id,
+            prospect_name=prospect_name,
+            message_content=message_content,
+            status=MessageStatus.UNREAD,
+            timestamp=datetime.now(),
+            conversation_url=conversation_url,
+            conversation_id=conversation_id,
+            message_digest=message_digest,
+            property_address=property_address
+        )
+    
+    @observe_stage("open_conversation")
     def open_conversation(self, conversation_url: str) -> bool:
         """Open a specific conversation by clicking on it"""
         try:
@@ -433,55 +904,120 @@ class ZillowSeleniumScraper:
             # Find the conversation item by its ID
             conversation_element = self.driver.find_element(By.CSS_SELECTOR, f'[data-testid="conversation-item"][id="{conversation_id}"]')
             
+            # Remember the thread that is showing now so it is not mistaken for the new one,
+            # unless it already is this conversation and clicking it may not re-render it
+            previous_item = None
+            if conversation_id not in self.driver.current_url:
+                previous_items = self.driver.find_elements(By.CSS_SELECTOR, '[data-testid="message-item"]')
+                previous_item = previous_items[0] if previous_items else None
+            
             # Click on the conversation to open it
             self.human_click(conversation_element)
-            self.human_delay(2, 4)
+            driver_lifecycle.record_conversation(self)
             
             # Wait for conversation to load
-            try:
-                # Look for conversation view elements
-                conversation_selectors = [
-                    '[data-testid="message-item"]'
-                ]
-                
-                conversation_loaded = False
-                for selector in conversation_selectors:
-                    try:
-                        WebDriverWait(self.driver, 5).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                        conversation_loaded = True
-                        break
-                    except TimeoutException:
-                        continue
-                
-                if conversation_loaded:
-                    logger.info(f"Opened conversation: {conversation_id}")
-                    return True
-                else:
-                    logger.error(f"Conversation did not load: {conversation_id}")
-                    return False
-                    
-            except TimeoutException:
-                logger.error(f"Conversation did not load: {conversation_id}")
-                return False
+            conversation_selectors = [
+                '[data-testid="message-item"]'
+            ]
+            if self.resolve_selector("conversation_ready", conversation_selectors, timeout=5,
+                                     ready=self._conversation_ready(conversation_id, previous_item)):
+                logger.info(f"Opened conversation: {conversation_id}")
+                return True
+            logger.error(f"Conversation did not load: {conversation_id}")
+            return False
             
         except Exception as e:
             logger.error(f"Failed to open conversation {conversation_url}: {e}")
             return False
     
+    def open_conversation_tab(self, conversation_url: str) -> Optional[str]:
+        """Start loading a conversation in a new tab and return its window handle
+        
+        The page keeps loading in the background; the driver stays on the
+        current window so work there can continue meanwhile.
+        """
+        try:
+            current = self.driver.current_window_handle
+            before = set(self.driver.window_handles)
+            # Lean mode has to block resources in the new tab before it loads anything
+            url = "about:blank" if settings.lean_page_load else conversation_url
+            self.driver.execute_script("window.open(arguments[0], '_blank');", url)
+            driver_lifecycle.record_conversation(self)
+            opened = [handle for handle in self.driver.window_handles if handle not in before]
+            if opened and settings.lean_page_load:
+                self.driver.switch_to.window(opened[0])
+                self._block_heavy_resources()
+                # Assigning the location returns at once, the tab loads in the background
+                self.driver.execute_script("window.location.href = arguments[0];", conversation_url)
+            # Switching back also brings the current tab to the front again
+            self.driver.switch_to.window(current)
+            return opened[0] if opened else None
+        except Exception as e:
+            logger.error(f"Failed to open a tab for {conversation_url}: {e}")
+            return None
+    
+    def switch_to_conversation_tab(self, handle: str, conversation_id: str) -> bool:
+        """Make a prefetched conversation tab current once its messages have rendered"""
+        try:
+            self.driver.switch_to.window(handle)
+            if self.resolve_selector("conversation_ready", ['[data-testid="message-item"]'], timeout=5,
+                                     ready=self._conversation_ready(conversation_id, None)):
+                self.record_navigation("conversation")
+                logger.info(f"Opened conversation: {conversation_id}")
+                return True
+            logger.error(f"Conversation did not load: {conversation_id}")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to switch to conversation {conversation_id}: {e}")
+            return False
+    
+    def close_conversation_tab(self, handle: str, return_to: str):
+        """Close a conversation tab and go back to another window"""
+        try:
+            if handle in self.driver.window_handles:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(return_to)
+        except Exception as e:
+            logger.warning(f"Failed to close conversation tab: {e}")
+    
+    @staticmethod
+    def _conversation_ready(conversation_id: str, previous_item):
+        """Condition: the messages showing are the clicked conversation's, not the previous thread's
+        
+        The URL changes on click, before the new thread renders, so the
+        previous thread has to be gone as well.
+        """
+        def ready(driver):
+            if previous_item is not None and not EC.staleness_of(previous_item)(driver):
+                return False
+            return conversation_id in driver.current_url
+        return ready
+    
+    def _wait_for_sent_bubble(self, sent_before: int) -> bool:
+        """Resolve as soon as a new "You sent" bubble is added to the thread"""
+        timeout = settings.reply_confirm_timeout
+        start = time.perf_counter()
+        # Only this wait needs the longer limit, later async scripts keep the driver's own
+        previous_timeout = self.driver.timeouts.script
+        try:
+            self.driver.set_script_timeout(timeout + 5)
+            return bool(self.driver.execute_async_script(
+                SENT_BUBBLE_OBSERVER_SCRIPT, SENT_MESSAGE_SELECTOR, sent_before, int(timeout * 1000)
+            ))
+        finally:
+            self.driver.set_script_timeout(previous_timeout)
+            self.wait_timings["reply_confirmed"] = time.perf_counter() - start
+    
+    @observe_stage("send_reply")
     def send_reply(self, message: str) -> bool:
         """Send a reply in the current conversation with human-like behavior"""
         try:
             # First, try to find and click on the "Choose saved reply" button to reveal message input
             # Look for message input field
             message_input = None
-            try:
-                self.driver.find_element(By.XPATH,
-                                         "//li[@data-testid='message-item' and contains(@aria-label, 'You sent')][last()]//div[@data-testid='chat-bubble']/p").text
+            if self.already_replied():
                 return False
-            except:
-                pass
             # Try to find textarea with specific placeholder text
             textarea_selectors = [
                 '[aria-label="Message input;"]'
@@ -498,10 +1034,10 @@ class ZillowSeleniumScraper:
                 except NoSuchElementException:
                     continue
             
-            # Clear any existing text and type the message with human-like behavior
+            # Clear any existing text and enter the message
             message_input.clear()
             self.human_delay(0.5, 1.0)
-            self.human_type(message_input, message)
+            self.enter_text("reply", message_input, message, settings.reply_entry_strategy)
             self.human_delay(1, 2)
 
             # Find and click send button - look for Enter key or send button
@@ -519,20 +1055,34 @@ class ZillowSeleniumScraper:
                     continue
 
             if send_button:
-                # Click send with human-like behavior
+                # Click send with human-like behavior, then wait for our bubble to appear
+                sent_before = len(self.driver.find_elements(By.CSS_SELECTOR, SENT_MESSAGE_SELECTOR))
                 self.human_click(send_button)
-                self.human_delay(2, 4)
+                if not self._wait_for_sent_bubble(sent_before):
+                    logger.error("Reply was not confirmed by a new sent message bubble")
+                    return False
                 return True
             return True
         except Exception as e:
             logger.error(f"Failed to send reply: {e}")
             return False
     
+    def already_replied(self) -> bool:
+        """Check whether the open conversation already shows a reply from us"""
+        return bool(self.driver.find_elements(By.XPATH, ALREADY_REPLIED_XPATH))
+    
+    @observe_stage("close")
     def close(self):
         """Close browser and cleanup"""
         try:
             if self.driver:
+                BROWSERS_LIVE.dec()
+                driver_lifecycle.unregister(self)
                 self.driver.quit()
                 logger.info("Browser closed")
         except Exception as e:
             logger.error(f"Error closing browser: {e}")
+        finally:
+            self.driver = None
+            self.is_logged_in = False
+            self.logged_in_email = None